@@ -0,0 +1,308 @@
+import os
+import time
+import queue
+import shutil
+import logging
+import sqlite3
+import zipfile
+import itertools
+import threading
+
+# 归档格式：zip（deflate，可直接用资源管理器打开）或 xz（LZMA，压缩率更高、更慢）
+FORMATS = {
+    'zip': zipfile.ZIP_DEFLATED,
+    'xz': zipfile.ZIP_LZMA,
+}
+
+# 按线程统计CPU时间（Python 3.7+），旧版本用墙钟时间近似
+thread_time = getattr(time, 'thread_time', time.perf_counter)
+
+def member_path(member):
+    """包内名称去掉同一包中重名文件的序号（;n）"""
+    return member.split(';', 1)[0]
+
+class ArchiveIndex:
+    """归档索引（SQLite）：文件名 -> 所在的归档包和包内名称"""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS members ('
+            'name TEXT, member TEXT, bundle TEXT, size INTEGER, mtime REAL, archived REAL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS members_name ON members (name)')
+
+    def add(self, rows):
+        """记录一个归档包中的文件 [(文件名, 包内名称, 归档包, 大小, 修改时间, 归档时间)]"""
+        with self.lock:
+            self.conn.execute('BEGIN')
+            self.conn.executemany('INSERT INTO members VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self.conn.execute('COMMIT')
+
+    def find(self, name, date=None):
+        """按文件名或相对路径查找，最近归档的在前；date（YYYY-MM-DD）限定归档日期
+
+        name可以是文件名（a.utf8）、相对于源文件夹的路径（sub1/a.utf8）或
+        包含监控名称的完整包内名称（Paths/sub1/a.utf8）。
+        """
+        path = name.replace('\\', '/').strip('/')
+        sql = 'SELECT name, member, bundle, size, mtime, archived FROM members WHERE name = ?'
+        params = [path.rsplit('/', 1)[-1]]
+        if date:
+            sql += ' AND bundle LIKE ?'
+            params.append(date + '%')
+        with self.lock:
+            rows = self.conn.execute(sql + ' ORDER BY archived DESC', params).fetchall()
+        if '/' not in path:
+            return rows
+        return [row for row in rows
+                if member_path(row[1]) == path or member_path(row[1]).endswith('/' + path)]
+
+    def close(self):
+        try:
+            with self.lock:
+                self.conn.close()
+        except Exception as e:
+            logging.error(f"关闭归档索引失败: {str(e)}")
+
+class Archiver:
+    """在后台把处理前的源文件压缩归档
+
+    源文件删除之前先硬链接到 归档文件夹/spool 中，不复制内容，处理流程
+    不需要等待压缩；硬链接不可用（例如跨磁盘）时才复制。源文件直接重命名
+    为目标文件时必须复制，归档的原始文件不能和交付的目标文件是同一个文件。归档线程把暂存的文件成批写入按日期分文件夹的zip归档包
+    （日期/part-0001.zip），每个包写完后才改为正式名称并写入索引，再删除
+    暂存文件，中途退出时暂存文件下次启动继续归档。
+
+    压缩占用的CPU不超过cpu_budget（单个核心的比例）：每压缩一个文件后
+    按所用CPU时间休眠。内存中最多排队queue_size个文件，超出时只留在
+    暂存文件夹中，排队的文件处理完后再扫描暂存文件夹补上。
+    """
+
+    def __init__(self, path, fmt='zip', cpu_budget=0.25, queue_size=10000,
+                 batch_size=200, batch_interval=30.0, name='Archiver'):
+        if fmt not in FORMATS:
+            logging.warning(f"未知的归档格式 {fmt}，使用 zip")
+            fmt = 'zip'
+        self.path = path
+        self.spool = os.path.join(path, 'spool')
+        self.compression = FORMATS[fmt]
+        self.cpu_budget = min(1.0, max(0.01, cpu_budget))
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.name = name
+        self.thread = None
+        self.running = False
+        self.overflow = threading.Event()  # 有文件只在暂存文件夹中、不在队列里
+        self.index = None
+        self.sequence = itertools.count()
+        self.spool_dirs = set()  # 已创建的暂存子文件夹
+        self.parts = {}  # 日期 -> 当天最后一个归档包的序号
+        self.stats_lock = threading.Lock()
+        self.archived = 0  # 已归档的文件数
+        self.archived_bytes = 0
+        self.compressed_bytes = 0
+        self.failed = 0
+
+    def start(self):
+        if self.running:
+            return
+        os.makedirs(self.spool, exist_ok=True)
+        self.index = ArchiveIndex(os.path.join(self.path, 'index.db'))
+        self.running = True
+        # 上次退出时未归档的暂存文件
+        self.overflow.set()
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """停止归档线程，未归档的文件留在暂存文件夹中"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+        if self.index:
+            self.index.close()
+            self.index = None
+
+    def add(self, file_path, watch, name, link=True):
+        """暂存即将删除或移走的源文件，name为文件相对于源文件夹的路径
+
+        link为False时复制而不是硬链接（源文件将被重命名为目标文件）。
+        """
+        member = '/'.join([watch] + name.split(os.sep))
+        spool_file = os.path.join(self.spool, *member.split('/'))
+        spool_file += f".{int(time.time())}-{next(self.sequence)}"
+        directory = os.path.dirname(spool_file)
+        try:
+            if directory not in self.spool_dirs:
+                os.makedirs(directory, exist_ok=True)
+                self.spool_dirs.add(directory)
+            try:
+                if not link:
+                    raise OSError
+                os.link(file_path, spool_file)
+            except OSError:
+                # 复制到临时文件后再改名，归档线程不会压缩复制了一半的文件
+                temp_file = spool_file + '.tmp'
+                try:
+                    shutil.copy2(file_path, temp_file)
+                    os.replace(temp_file, spool_file)
+                except Exception:
+                    if os.path.exists(temp_file):
+                        os.remove(temp_file)
+                    raise
+        except Exception as e:
+            with self.stats_lock:
+                self.failed += 1
+            logging.error(f"暂存归档文件失败: {file_path}: {str(e)}")
+            return
+        try:
+            self.queue.put_nowait(spool_file)
+        except queue.Full:
+            self.overflow.set()
+
+    def _next_batch(self):
+        """从队列中取一批：凑满batch_size或第一个文件等待超过batch_interval"""
+        batch = []
+        deadline = None
+        while self.running and len(batch) < self.batch_size:
+            timeout = 0.5 if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=min(timeout, 0.5)))
+            except queue.Empty:
+                if not batch and self.overflow.is_set():
+                    # 队列已空，补上只在暂存文件夹中的文件
+                    self.overflow.clear()
+                    return self._scan_spool()
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.batch_interval
+        return batch
+
+    def _scan_spool(self):
+        files = []
+        for root, _, names in os.walk(self.spool):
+            files.extend(os.path.join(root, name) for name in names if not name.endswith('.tmp'))
+        files.sort()
+        return files
+
+    def _run(self):
+        while self.running:
+            batch = self._next_batch()
+            for start in range(0, len(batch), self.batch_size):
+                if not self.running:
+                    return
+                try:
+                    self._write_bundle(batch[start:start + self.batch_size])
+                except Exception as e:
+                    logging.error(f"写入归档包失败: {str(e)}", exc_info=True)
+
+    def _member_name(self, spool_file):
+        """暂存文件对应的包内名称：监控名称/相对路径（去掉暂存时加的序号）"""
+        relative = os.path.relpath(spool_file, self.spool).rsplit('.', 1)[0]
+        return relative.replace(os.sep, '/')
+
+    def _bundle_path(self, day):
+        """当天下一个归档包的路径"""
+        folder = os.path.join(self.path, day)
+        if day not in self.parts:
+            os.makedirs(folder, exist_ok=True)
+            numbers = [int(name[5:9]) for name in os.listdir(folder)
+                       if name.startswith('part-') and name[5:9].isdigit()]
+            self.parts[day] = max(numbers, default=0)
+        self.parts[day] += 1
+        return os.path.join(folder, f"part-{self.parts[day]:04d}.zip")
+
+    def _throttle(self, cpu_time):
+        """按CPU预算休眠：用了t秒CPU后休眠 t*(1/预算-1) 秒"""
+        if self.cpu_budget < 1.0 and cpu_time > 0:
+            time.sleep(cpu_time * (1.0 / self.cpu_budget - 1.0))
+
+    def _write_bundle(self, batch):
+        day = time.strftime('%Y-%m-%d')
+        bundle = self._bundle_path(day)
+        temp_file = bundle + '.tmp'
+        rows, done, members = [], [], set()
+        size = 0
+        with zipfile.ZipFile(temp_file, 'w', self.compression) as zf:
+            for spool_file in batch:
+                member = self._member_name(spool_file)
+                if member in members:
+                    # 同一个包中的重名文件（同一文件被重新导出）
+                    member = f"{member};{len(done)}"
+                started = thread_time()
+                try:
+                    st = os.stat(spool_file)
+                    zf.write(spool_file, member)
+                except OSError:
+                    # 已被归档（扫描暂存文件夹时和队列重复）或无法读取
+                    continue
+                self._throttle(thread_time() - started)
+                members.add(member)
+                done.append(spool_file)
+                size += st.st_size
+                rows.append((member.rsplit('/', 1)[-1].split(';')[0], member,
+                             os.path.relpath(bundle, self.path).replace(os.sep, '/'),
+                             st.st_size, st.st_mtime, time.time()))
+        if not rows:
+            os.remove(temp_file)
+            self.parts[day] -= 1
+            return
+        # 归档包写入磁盘后才删除暂存文件
+        with open(temp_file, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(temp_file, bundle)
+        self.index.add(rows)
+        for spool_file in done:
+            try:
+                os.remove(spool_file)
+            except OSError as e:
+                logging.warning(f"删除暂存文件失败: {spool_file}: {str(e)}")
+        with self.stats_lock:
+            self.archived += len(done)
+            self.archived_bytes += size
+            self.compressed_bytes += os.path.getsize(bundle)
+        logging.info("已归档 %d 个文件: %s", len(done), bundle)
+
+    def get_stats(self):
+        with self.stats_lock:
+            archived, size, compressed = self.archived, self.archived_bytes, self.compressed_bytes
+        text = f"归档: {archived} 个"
+        if size:
+            text += f" (压缩至 {compressed / size:.0%})"
+        return text + f" / 等待 {self.queue.qsize()}"
+
+def extract(path, name, output_dir='.', date=None):
+    """从归档中取出一个文件（最近归档的版本），返回取出的文件路径
+
+    name为文件名或相对路径；不同子文件夹中有同名文件时必须用相对路径
+    指定。通过索引找到所在的归档包，只解压这一个文件。
+    """
+    index_file = os.path.join(path, 'index.db')
+    if not os.path.exists(index_file):
+        raise FileNotFoundError(f"没有归档索引: {index_file}")
+    index = ArchiveIndex(index_file)
+    try:
+        rows = index.find(name, date)
+    finally:
+        index.close()
+    if not rows:
+        raise FileNotFoundError(f"归档中没有文件: {name}")
+    paths = sorted({member_path(row[1]) for row in rows})
+    if len(paths) > 1:
+        raise ValueError(f"归档中有多个 {name}，请用相对路径指定: {', '.join(paths)}")
+    _, member, bundle, _, mtime, _ = rows[0]
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, os.path.basename(paths[0]))
+    with zipfile.ZipFile(os.path.join(path, *bundle.split('/'))) as zf:
+        with zf.open(member) as src, open(output_file, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+    os.utime(output_file, (mtime, mtime))
+    return output_file
@@ -0,0 +1,132 @@
+import os
+import time
+import logging
+import threading
+import functools
+from worker_pool import BACKLOG
+from treewalk import list_directory, walk_parallel
+
+# 积压文件的处理顺序
+ORDERS = {
+    'mtime': lambda item: (item[2].st_mtime, item[0]),  # 最早修改的优先
+    'size': lambda item: (item[2].st_size, item[0]),  # 最小的优先
+    'name': lambda item: item[0],  # 按文件名
+}
+
+class BacklogDrain:
+    """在后台把源文件夹中已有的文件交给处理池
+
+    文件按配置的顺序以低优先级逐步提交，排队中的积压文件最多占用
+    处理队列的一半，实时事件总能插队。递归监控的文件夹树由scan_workers
+    个线程并行遍历。
+    """
+
+    def __init__(self, pool, order='mtime', name='Backlog', scan_workers=8):
+        if order not in ORDERS:
+            logging.warning(f"未知的积压处理顺序 {order}，使用 mtime")
+            order = 'mtime'
+        self.pool = pool
+        self.order = order
+        self.name = name
+        self.scan_workers = scan_workers
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+        self.total = 0
+        self.done = 0
+        self.queued = 0  # 已提交但尚未处理完的积压文件
+        self.started = 0.0
+
+    def start(self, handlers):
+        """开始处理积压文件（不阻塞调用线程）"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.running = True
+        self.thread = threading.Thread(
+            target=self._run, args=(list(handlers),), name=self.name, daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _scan(self, handlers):
+        """列出所有源文件夹中需要处理的文件 (路径, 处理器, stat)"""
+        items = []
+        for handler in handlers:
+            source_path = handler.source_path
+            if not os.path.exists(source_path):
+                continue
+            logging.info(f"检查源文件夹中的现有文件: {source_path}")
+            started = time.monotonic()
+            count = len(items)
+            visit = functools.partial(list_directory, accept=handler.accepts)
+            for _, files in walk_parallel(source_path, visit, handler.recursive, self.scan_workers):
+                for file_path, st in files:
+                    # 扫描时的大小和修改时间，排队期间没有变化的文件不必再等待静默时间
+                    handler.readiness.observe(file_path, st)
+                    items.append((file_path, handler, st))
+            if handler.recursive:
+                logging.info("遍历 %s 用时 %.2f 秒，找到 %d 个文件",
+                             source_path, time.monotonic() - started, len(items) - count)
+        return items
+
+    def _run(self, handlers):
+        try:
+            items = self._scan(handlers)
+        except Exception as e:
+            logging.error(f"处理现有文件时出错: {str(e)}", exc_info=True)
+            self.running = False
+            return
+
+        items.sort(key=ORDERS[self.order])
+        with self.lock:
+            self.total = len(items)
+            self.done = 0
+            self.queued = 0
+            self.started = time.monotonic()
+        if items:
+            logging.info(f"发现 {len(items)} 个积压文件，按 {self.order} 顺序处理")
+
+        limit = max(1, self.pool.queue_size // 2)
+        for file_path, handler, _ in items:
+            # 排队中的积压文件不超过队列的一半，为实时事件留出空间
+            while self.running and self.queued >= limit:
+                time.sleep(0.05)
+            if not self.running:
+                return
+            with self.lock:
+                self.queued += 1
+            job = functools.partial(self._process, handler)
+            if not self.pool.submit(file_path, job, priority=BACKLOG):
+                # 已在队列或处理中（例如实时事件已提交）
+                self._finish_one()
+
+        if self.total:
+            logging.info("积压文件已全部提交")
+
+    def _process(self, handler, file_path):
+        try:
+            handler.handle_file(file_path, BACKLOG)
+        finally:
+            self._finish_one()
+
+    def _finish_one(self):
+        with self.lock:
+            self.queued -= 1
+            self.done += 1
+
+    def get_progress(self):
+        """积压处理进度文本，没有积压时返回空字符串"""
+        with self.lock:
+            total, done, started = self.total, self.done, self.started
+        if not total or done >= total:
+            return ""
+        eta = ""
+        if done:
+            remaining = (time.monotonic() - started) / done * (total - done)
+            if remaining >= 60:
+                eta = f"，剩余约 {remaining / 60:.0f} 分钟"
+            else:
+                eta = f"，剩余约 {remaining:.0f} 秒"
+        return f"积压: {done}/{total}{eta}"
@@ -0,0 +1,363 @@
+"""Tibasepath 性能测试
+
+在临时文件夹中按配置的大小分布、第7行匹配比例、到达速率和突发模式
+生成 .utf8 文件，通过真实的观察者和 FileHandler 处理，报告吞吐量、
+端到端延迟分位数、峰值内存和CPU时间，并把结果保存为JSON，便于比较
+不同版本的结果。
+
+    python benchmark.py --files 1000 --rate 50 --burst 10 --output result.json
+    python benchmark.py --files 1000 --compare result.json
+    python benchmark.py --files 500 --heap-sizes 0,200,800
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+from engine import TibasepathEngine
+
+WRITE_CHUNK_SIZE = 64 * 1024  # 模拟仪器软件分块写入
+HEAP_OBJECT_SIZE = 100  # grow_heap中每个小对象大约占用的字节数
+
+def parse_size(text):
+    """把 4k、1.5m、200 这样的大小转换为字节数"""
+    text = text.strip().lower()
+    units = {'k': 1024, 'm': 1024 * 1024, 'g': 1024 * 1024 * 1024}
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+def parse_distribution(text):
+    """解析 大小:权重 列表，例如 4k:70,64k:25,1m:5"""
+    sizes, weights = [], []
+    for item in text.split(','):
+        size, _, weight = item.partition(':')
+        sizes.append(parse_size(size))
+        weights.append(float(weight or 1))
+    return sizes, weights
+
+def percentile(values, q):
+    """已排序列表的分位数（最近秩）"""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(q * len(values))) - 1))
+    return values[index]
+
+def peak_rss():
+    """进程的峰值内存（MB），无法获取时返回None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux以KB为单位，macOS以字节为单位
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import win32api
+        import win32process
+        info = win32process.GetProcessMemoryInfo(win32api.GetCurrentProcess())
+        return info['PeakWorkingSetSize'] / 1024 / 1024
+    except Exception:
+        return None
+
+def grow_heap(megabytes):
+    """分配大量受垃圾回收跟踪的小对象，模拟长期运行后变大的进程堆"""
+    return [[i] for i in range(int(megabytes * 1024 * 1024 / HEAP_OBJECT_SIZE))]
+
+def make_content(size, matched):
+    """生成一个导出文件的内容：6行表头、第7行、其余为数据行，换行符为CRLF"""
+    header = b''.join(b'Header%d=value\r\n' % i for i in range(1, 7))
+    # 第7行含有需要修改的 6 时会被规则修改
+    line7 = b'Result 6\r\n' if matched else b'Result 5\r\n'
+    filler = b'0123456789,ABCDEFGHIJ,abcdefghij,0123456789\r\n'
+    body = header + line7
+    if size > len(body):
+        body += filler * ((size - len(body)) // len(filler) + 1)
+    return body[:max(size, len(header + line7))]
+
+class ArrivalRecorder(FileSystemEventHandler):
+    """记录文件出现在目标文件夹的时间"""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.arrived = {}  # 文件名 -> perf_counter
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def arrive(self, path):
+        name = os.path.basename(path)
+        if name not in self.expected:
+            return
+        with self.lock:
+            if name not in self.arrived:
+                self.arrived[name] = time.perf_counter()
+                if len(self.arrived) >= len(self.expected):
+                    self.done.set()
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.arrive(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.arrive(event.dest_path)
+
+class Benchmark:
+    """生成负载、驱动引擎并汇总结果"""
+
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.sizes, self.weights = parse_distribution(args.sizes)
+        self.contents = {}  # (大小, 是否匹配) -> 内容
+        self.sizes_written = {}  # 文件名 -> 大小
+
+    def content(self, size, matched):
+        key = (size, matched)
+        if key not in self.contents:
+            self.contents[key] = make_content(size, matched)
+        return self.contents[key]
+
+    def write_config(self, root, source, target):
+        args = self.args
+        config_file = os.path.join(root, 'tibasepath.conf')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            f.write(
+                "[Paths]\n"
+                f"source = {source}\n"
+                f"target = {target}\n"
+                "\n[Processing]\n"
+                f"workers = {args.workers}\n"
+                f"queue_size = {max(1000, args.files)}\n"
+                f"settle = {args.settle}\n"
+                f"quiet_period = {args.quiet_period}\n"
+                "rescan_interval = 0\n"
+                f"durability = {args.durability}\n"
+                f"journal = {os.path.join(root, 'tibasepath.db')}\n"
+                f"content_index = {'' if args.no_content_index else os.path.join(root, 'tibasepath.index.db')}\n"
+                f"dead_letter = {os.path.join(root, 'failed')}\n"
+            )
+        return config_file
+
+    def generate(self, source):
+        """按到达速率和突发模式写入文件，返回 文件名 -> 写完的时间"""
+        args = self.args
+        written = {}
+        burst = max(1, args.burst)
+        # 每组burst个文件同时到达，组间隔使平均速率为rate
+        interval = burst / args.rate if args.rate else 0
+        next_group = time.perf_counter()
+        for index in range(args.files):
+            if index % burst == 0 and interval:
+                wait = next_group - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                next_group += interval
+            name = f"bench{index:06d}.utf8"
+            size = self.random.choices(self.sizes, self.weights)[0]
+            data = self.content(size, self.random.random() < args.match)
+            with open(os.path.join(source, name), 'wb') as f:
+                for offset in range(0, len(data), WRITE_CHUNK_SIZE):
+                    f.write(data[offset:offset + WRITE_CHUNK_SIZE])
+            written[name] = time.perf_counter()
+            self.sizes_written[name] = len(data)
+        return written
+
+    def run(self):
+        args = self.args
+        root = tempfile.mkdtemp(prefix='tibasepath-bench-', dir=args.dir)
+        source = os.path.join(root, 'source')
+        target = os.path.join(root, 'target')
+        os.makedirs(source)
+        os.makedirs(target)
+        expected = {f"bench{index:06d}.utf8" for index in range(args.files)}
+
+        engine = TibasepathEngine(self.write_config(root, source, target))
+        recorder = ArrivalRecorder(expected)
+        observer = Observer()
+        observer.daemon = True
+        try:
+            engine.load_config()
+            if not engine.start_monitoring():
+                raise RuntimeError("监控启动失败")
+            observer.schedule(recorder, target, recursive=False)
+            observer.start()
+
+            cpu_started = time.process_time()
+            started = time.perf_counter()
+            written = self.generate(source)
+            generated = time.perf_counter()
+            recorder.done.wait(args.timeout)
+            finished = time.perf_counter()
+            cpu_time = time.process_time() - cpu_started
+
+            with recorder.lock:
+                arrived = dict(recorder.arrived)
+            return self.summarize(engine, written, arrived, started, generated, finished, cpu_time)
+        finally:
+            observer.stop()
+            engine.stop()
+            if not args.keep:
+                shutil.rmtree(root, ignore_errors=True)
+
+    def summarize(self, engine, written, arrived, started, generated, finished, cpu_time):
+        args = self.args
+        latencies = sorted(
+            (arrived[name] - written[name]) * 1000
+            for name in arrived if name in written
+        )
+        completed = len(latencies)
+        end = max(arrived.values()) if arrived else finished
+        elapsed = end - started
+        total_bytes = sum(self.sizes_written[name] for name in arrived if name in written)
+        return {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'parameters': {
+                'files': args.files,
+                'sizes': args.sizes,
+                'match': args.match,
+                'rate': args.rate,
+                'burst': args.burst,
+                'workers': args.workers,
+                'durability': args.durability,
+                'settle': args.settle,
+                'quiet_period': args.quiet_period,
+                'seed': args.seed,
+            },
+            'completed': completed,
+            'missing': args.files - completed,
+            'elapsed_seconds': round(elapsed, 3),
+            'generate_seconds': round(generated - started, 3),
+            'files_per_second': round(completed / elapsed, 2) if elapsed > 0 else None,
+            'mb_per_second': round(total_bytes / 1024 / 1024 / elapsed, 3) if elapsed > 0 else None,
+            'latency_ms': {
+                'p50': percentile(latencies, 0.5),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99),
+                'max': latencies[-1] if latencies else None,
+            },
+            'cpu_seconds': round(cpu_time, 3),
+            'cpu_ms_per_file': round(cpu_time * 1000 / completed, 3) if completed else None,
+            'peak_rss_mb': peak_rss(),
+            'counters': engine.get_counters(),
+            'metrics': engine.metrics.snapshot(),
+        }
+
+# 比较两次结果时显示的指标：(名称, 取值函数, 数值越大越好)
+COMPARED = (
+    ('吞吐量 (个/秒)', lambda r: r['files_per_second'], True),
+    ('吞吐量 (MB/秒)', lambda r: r['mb_per_second'], True),
+    ('延迟 p50 (毫秒)', lambda r: r['latency_ms']['p50'], False),
+    ('延迟 p95 (毫秒)', lambda r: r['latency_ms']['p95'], False),
+    ('延迟 p99 (毫秒)', lambda r: r['latency_ms']['p99'], False),
+    ('CPU (毫秒/个)', lambda r: r['cpu_ms_per_file'], False),
+    ('峰值内存 (MB)', lambda r: r['peak_rss_mb'], False),
+)
+
+def print_result(result):
+    latency = result['latency_ms']
+    print(f"完成: {result['completed']}/{result['parameters']['files']}，用时 {result['elapsed_seconds']} 秒")
+    print(f"吞吐量: {result['files_per_second']} 个/秒，{result['mb_per_second']} MB/秒")
+    if latency['p50'] is not None:
+        print(
+            f"端到端延迟: p50 {latency['p50']:.1f} / p95 {latency['p95']:.1f} / "
+            f"p99 {latency['p99']:.1f} / 最大 {latency['max']:.1f} 毫秒"
+        )
+    print(f"CPU: {result['cpu_seconds']} 秒（{result['cpu_ms_per_file']} 毫秒/个）")
+    if result['peak_rss_mb'] is not None:
+        print(f"峰值内存: {result['peak_rss_mb']:.1f} MB")
+
+def print_comparison(baseline, result):
+    print(f"与 {baseline['timestamp']} 的结果比较:")
+    for name, value, higher_is_better in COMPARED:
+        try:
+            old, new = value(baseline), value(result)
+        except (KeyError, TypeError):
+            continue
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = change < 0 if higher_is_better else change > 0
+        mark = " (变差)" if worse and abs(change) >= 5 else ""
+        print(f"  {name}: {old:.2f} -> {new:.2f} ({change:+.1f}%){mark}")
+
+def run_heap_sweep(args, heap_sizes):
+    """在不同的堆大小下重复同一负载，显示每个文件的CPU时间如何随堆大小变化"""
+    results = []
+    for megabytes in heap_sizes:
+        ballast = grow_heap(megabytes)
+        result = Benchmark(args).run()
+        del ballast
+        result['heap_mb'] = megabytes
+        results.append(result)
+        print(
+            f"堆 {megabytes:>6g} MB: CPU {result['cpu_ms_per_file']} 毫秒/个，"
+            f"吞吐量 {result['files_per_second']} 个/秒，峰值内存 {result['peak_rss_mb']:.0f} MB"
+        )
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tibasepath 性能测试")
+    parser.add_argument('--files', type=int, default=500, help="生成的文件数")
+    parser.add_argument('--sizes', default='4k:70,64k:25,1m:5',
+                        help="文件大小分布，大小:权重，用逗号分隔")
+    parser.add_argument('--match', type=float, default=0.5,
+                        help="第7行需要修改的文件比例（0-1）")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="平均到达速率（个/秒），0表示尽快写入")
+    parser.add_argument('--burst', type=int, default=1,
+                        help="每次同时到达的文件数")
+    parser.add_argument('--workers', type=int, default=4, help="工作线程数")
+    parser.add_argument('--durability', default='strict', help="strict、group 或 relaxed")
+    parser.add_argument('--no-content-index', action='store_true',
+                        help="不使用内容索引（比较计算摘要的开销）")
+    parser.add_argument('--settle', type=float, default=0.1, help="事件合并的静默时间（秒）")
+    parser.add_argument('--quiet-period', type=float, default=0.2,
+                        help="判断写入完成的静默时间（秒）")
+    parser.add_argument('--timeout', type=float, default=300, help="等待处理完成的最长时间（秒）")
+    parser.add_argument('--seed', type=int, default=1, help="随机数种子，相同种子生成相同的负载")
+    parser.add_argument('--dir', default=None, help="临时文件夹所在的位置（默认系统临时目录）")
+    parser.add_argument('--keep', action='store_true', help="保留生成的文件")
+    parser.add_argument('--output', default=None, help="结果JSON文件")
+    parser.add_argument('--compare', default=None, help="与之前保存的结果JSON比较")
+    parser.add_argument('--heap-sizes', default=None,
+                        help="依次在这些额外堆大小（MB，逗号分隔）下运行，比较每个文件的CPU时间")
+    parser.add_argument('--verbose', action='store_true', help="显示处理日志")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    if args.heap_sizes:
+        results = run_heap_sweep(args, [float(size) for size in args.heap_sizes.split(',')])
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({'heap_sweep': results}, f, ensure_ascii=False, indent=2)
+            print(f"结果已保存到 {args.output}")
+        return 0 if all(result['missing'] == 0 for result in results) else 1
+
+    result = Benchmark(args).run()
+    print_result(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print_comparison(json.load(f), result)
+    return 0 if result['missing'] == 0 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import time
+import threading
+from collections import OrderedDict
+
+class BoundedRecord:
+    """限制数量和存活时间的记录表（LRU + TTL）
+
+    可以像dict一样保存 键 -> 值，也可以像set一样用add()只记录键。
+    超过max_size时淘汰最久未更新的记录，超过ttl秒的记录自动过期。
+    """
+
+    def __init__(self, max_size=10000, ttl=86400.0):
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl  # 0表示不过期
+        self.items = OrderedDict()  # 键 -> (值, 更新时间)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # 因数量超限被淘汰
+        self.expirations = 0  # 因超时过期
+
+    def _expire(self, now):
+        # 记录按更新时间排序，只需从最旧的一端检查
+        if not self.ttl:
+            return
+        while self.items:
+            key, (_, updated) = next(iter(self.items.items()))
+            if now - updated < self.ttl:
+                break
+            self.items.popitem(last=False)
+            self.expirations += 1
+
+    def __setitem__(self, key, value):
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            self.items[key] = (value, now)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+                self.evictions += 1
+
+    def add(self, key):
+        self[key] = True
+
+    def get(self, key, default=None):
+        with self.lock:
+            self._expire(time.monotonic())
+            item = self.items.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return item[0]
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def discard(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+    def get_stats(self):
+        """记录数和命中/淘汰统计"""
+        return (
+            f"{len(self.items)}/{self.max_size} "
+            f"(命中 {self.hits} / 淘汰 {self.evictions + self.expirations})"
+        )
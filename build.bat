@@ -22,6 +22,24 @@ pyinstaller --noconfirm ^
     --add-data "metrohm.ico;." ^
     --add-data "logger.py;." ^
     --add-data "single_instance.py;." ^
+    --add-data "engine.py;." ^
+    --add-data "gui.py;." ^
+    --add-data "worker_pool.py;." ^
+    --add-data "readiness.py;." ^
+    --add-data "rules.py;." ^
+    --add-data "journal.py;." ^
+    --add-data "bounded_record.py;." ^
+    --add-data "scheduler.py;." ^
+    --add-data "reconciler.py;." ^
+    --add-data "backlog.py;." ^
+    --add-data "durability.py;." ^
+    --add-data "retry.py;." ^
+    --add-data "metrics.py;." ^
+    --add-data "fanout.py;." ^
+    --add-data "content_index.py;." ^
+    --add-data "treewalk.py;." ^
+    --add-data "archive.py;." ^
+    --add-data "validation.py;." ^
     --hidden-import=win32api ^
     --hidden-import=win32con ^
     --hidden-import=PIL ^
@@ -0,0 +1,93 @@
+import os
+import time
+import logging
+import sqlite3
+import hashlib
+import threading
+
+DIGEST_SIZE = 16  # 索引中保存的摘要长度（字节）
+
+def new_hasher():
+    """写入目标文件时流式计算内容摘要：SHA-256在支持SHA指令的CPU上比blake2快一倍以上"""
+    return hashlib.sha256()
+
+class ContentIndex:
+    """目标文件的内容索引（SQLite），用于跳过内容相同的重复写入
+
+    按目标文件路径记录写入时计算的摘要、大小，以及提交后目标文件的
+    修改时间。目标文件的大小和修改时间与记录一致时，才认为它仍是当时
+    写入的内容。数据只保存在数据库中，第一次使用时才打开，不占用内存；
+    记录超过limit条时删除最早的记录。
+    """
+
+    PRUNE_EVERY = 1000  # 每写入多少条记录检查一次是否超出上限
+
+    def __init__(self, db_file, limit=100000):
+        self.db_file = db_file
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.conn = None
+        self.writes = 0
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS contents ('
+                'target TEXT PRIMARY KEY, digest BLOB, size INTEGER, mtime INTEGER, updated REAL)'
+            )
+        return self.conn
+
+    def matches(self, target, digest, size):
+        """目标文件是否仍是内容相同的上次写入结果"""
+        with self.lock:
+            row = self._connect().execute(
+                'SELECT digest, size, mtime FROM contents WHERE target = ?', (target,)
+            ).fetchone()
+        if row is None or row[0] != digest or row[1] != size:
+            return False
+        try:
+            st = os.stat(target)
+        except OSError:
+            # 目标文件已被取走，记录不再有用
+            self.remove(target)
+            return False
+        return st.st_size == size and st.st_mtime_ns == row[2]
+
+    def update(self, target, digest, size):
+        """目标文件提交后记录它的内容摘要"""
+        try:
+            st = os.stat(target)
+        except OSError:
+            return
+        if st.st_size != size:
+            return
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO contents (target, digest, size, mtime, updated) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (target, digest, size, st.st_mtime_ns, time.time())
+            )
+            self.writes += 1
+            if self.writes % self.PRUNE_EVERY == 0:
+                conn.execute(
+                    'DELETE FROM contents WHERE target IN ('
+                    'SELECT target FROM contents ORDER BY updated DESC LIMIT -1 OFFSET ?)',
+                    (self.limit,)
+                )
+
+    def remove(self, target):
+        with self.lock:
+            self._connect().execute('DELETE FROM contents WHERE target = ?', (target,))
+
+    def close(self):
+        try:
+            with self.lock:
+                if self.conn is not None:
+                    self.conn.close()
+                    self.conn = None
+        except Exception as e:
+            logging.error(f"关闭内容索引失败: {str(e)}")
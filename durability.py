@@ -0,0 +1,205 @@
+import os
+import time
+import logging
+import threading
+
+# 持久化模式
+STRICT = 'strict'  # 每个临时文件写完立即fsync
+GROUP = 'group'  # 一批临时文件和目标目录统一fsync
+RELAXED = 'relaxed'  # 不fsync，由操作系统决定何时写盘
+MODES = (STRICT, GROUP, RELAXED)
+
+def fsync_dir(path):
+    """把目录项（重命名的结果）写入磁盘，Windows不支持也不需要"""
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class CommitManager:
+    """把写好的临时文件提交（重命名）为目标文件
+
+    strict模式下临时文件写完即fsync，随后立即重命名；relaxed模式不fsync。
+    group模式下临时文件写完不fsync，由提交线程每group_size个文件或每
+    group_interval秒把这一批临时文件fsync、重命名，再fsync目标目录，
+    整批提交后才通知调用方删除源文件。
+    """
+
+    def __init__(self, mode=STRICT, group_size=32, group_interval=0.2, metrics=None,
+                 name='Committer'):
+        if mode not in MODES:
+            logging.warning(f"未知的持久化模式 {mode}，使用 {STRICT}")
+            mode = STRICT
+        self.mode = mode
+        self.group_size = max(1, int(group_size))
+        self.group_interval = max(0.0, group_interval)
+        self.metrics = metrics  # 记录fsync、重命名和提交等待的耗时（可选）
+        self.name = name
+        self.queue = []  # 等待提交的 (临时文件, 目标文件, 回调, 暂存时间)
+        self.cond = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.stats_lock = threading.Lock()
+        self.committed = 0  # 已提交的文件数
+        self.batches = 0  # group模式下已提交的批次数
+        self.sync_time = 0.0  # fsync累计耗时（秒）
+        self.latency = 0.0  # 从写完临时文件到提交完成的累计时间（秒）
+
+    def start(self):
+        """group模式下启动提交线程"""
+        if self.mode != GROUP or self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """停止提交线程，等待中的文件会先提交完"""
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def sync(self, f):
+        """临时文件写完、关闭前调用，返回内容是否已写入磁盘"""
+        f.flush()
+        if self.mode != STRICT:
+            return False
+        started = time.monotonic()
+        os.fsync(f.fileno())
+        elapsed = time.monotonic() - started
+        with self.stats_lock:
+            self.sync_time += elapsed
+            self.latency += elapsed
+        if self.metrics:
+            self.metrics.observe('fsync', elapsed)
+        return True
+
+    def commit(self, temp_file, target_file, callback):
+        """提交临时文件
+
+        提交完成后调用callback(error)，error为None表示目标文件已就位
+        （group模式下已写入磁盘），调用方此时才可以删除源文件。
+        strict和relaxed模式下在当前线程直接完成。
+        """
+        staged = time.monotonic()
+        if self.mode != GROUP:
+            try:
+                os.replace(temp_file, target_file)
+            except Exception as e:
+                self._notify(callback, e)
+                return
+            elapsed = time.monotonic() - staged
+            with self.stats_lock:
+                self.committed += 1
+                self.latency += elapsed
+            if self.metrics:
+                self.metrics.observe('rename', elapsed)
+            self._notify(callback, None)
+            return
+
+        with self.cond:
+            self.queue.append((temp_file, target_file, callback, staged))
+            if len(self.queue) == 1 or len(self.queue) >= self.group_size:
+                # 新一批开始计时，或已凑满一批
+                self.cond.notify()
+
+    def pending(self):
+        """等待提交的文件数"""
+        with self.cond:
+            return len(self.queue)
+
+    def _notify(self, callback, error):
+        try:
+            callback(error)
+        except Exception as e:
+            logging.error(f"提交回调出错: {str(e)}", exc_info=True)
+
+    def _next_batch(self):
+        """等待凑满一批或第一个文件等待超过group_interval，停止且没有文件时返回None"""
+        with self.cond:
+            while self.running and not self.queue:
+                self.cond.wait()
+            if not self.queue:
+                return None
+            deadline = self.queue[0][3] + self.group_interval
+            while self.running and len(self.queue) < self.group_size:
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    break
+                self.cond.wait(wait)
+            batch = self.queue[:self.group_size]
+            del self.queue[:self.group_size]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                logging.error(f"批量提交时出错: {str(e)}", exc_info=True)
+
+    def _commit_batch(self, batch):
+        started = time.monotonic()
+        done = []
+        for temp_file, target_file, callback, staged in batch:
+            try:
+                synced = time.monotonic()
+                fd = os.open(temp_file, os.O_RDWR)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                renamed = time.monotonic()
+                os.replace(temp_file, target_file)
+                if self.metrics:
+                    self.metrics.observe('fsync', renamed - synced)
+                    self.metrics.observe('rename', time.monotonic() - renamed)
+                done.append((target_file, callback, staged))
+            except Exception as e:
+                self._notify(callback, e)
+
+        # 目标目录写入磁盘后重命名才不会因断电丢失
+        for directory in {os.path.dirname(target_file) for target_file, _, _ in done}:
+            try:
+                fsync_dir(directory)
+            except OSError as e:
+                logging.warning(f"同步目标目录失败: {directory}: {str(e)}")
+
+        finished = time.monotonic()
+        with self.stats_lock:
+            self.batches += 1
+            self.committed += len(done)
+            self.sync_time += finished - started
+            self.latency += sum(finished - staged for _, _, staged in done)
+        if self.metrics:
+            for _, _, staged in done:
+                self.metrics.observe('commit', finished - staged)
+        logging.debug("批量提交 %d/%d 个文件，耗时 %.1f 毫秒", len(done), len(batch), (finished - started) * 1000)
+
+        for _, callback, _ in done:
+            self._notify(callback, None)
+
+    def get_stats(self):
+        """持久化模式及其代价：每个文件的平均fsync耗时和提交延迟"""
+        with self.stats_lock:
+            committed, batches = self.committed, self.batches
+            sync_time, latency = self.sync_time, self.latency
+        text = f"持久化: {self.mode}"
+        if not committed:
+            return text
+        text += (
+            f" (fsync {sync_time / committed * 1000:.1f} 毫秒/个, "
+            f"提交延迟 {latency / committed * 1000:.1f} 毫秒"
+        )
+        if batches:
+            text += f", 每批 {committed / batches:.1f} 个"
+        return text + ")"
@@ -0,0 +1,1387 @@
+import os
+import time
+import shutil
+import signal
+import logging
+import threading
+import functools
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+from logger import setup_logger
+from worker_pool import WorkerPool, LIVE, BACKLOG
+from readiness import ReadinessDetector, READY, WAITING, TIMEOUT
+from rules import RuleEngine
+from journal import ProcessingJournal
+from bounded_record import BoundedRecord
+from scheduler import CoalescingScheduler
+from reconciler import Reconciler
+from backlog import BacklogDrain
+from durability import CommitManager
+from retry import RetryQueue
+from metrics import Metrics, MetricsServer
+from fanout import Destination, Output, TeeWriter, FanOut, parse_paths
+from content_index import ContentIndex, new_hasher, DIGEST_SIZE
+from archive import Archiver
+from validation import Validator, ExportFormat, parse_names
+
+CONFIG_FILE = 'tibasepath.conf'
+
+def describe_changes(changes, limit=3):
+    """把修改的行概括为日志中的一段文字"""
+    if not changes:
+        return "未修改"
+    text = "; ".join(f"第{number}行 [{old}] -> [{new}]" for number, old, new in changes[:limit])
+    if len(changes) > limit:
+        text += f" 等共{len(changes)}处"
+    return text
+
+def format_stats(stats):
+    """把统计计数格式化为状态栏显示的文本"""
+    return (
+        f"总处理: {stats['total_processed']} | "
+        f"已修改: {stats['modified']} | "
+        f"已移动: {stats['moved']} | "
+        f"快速移动: {stats['renamed']} | "
+        f"错误: {stats['errors']} | "
+        f"死信: {stats['dead']} | "
+        f"隔离: {stats['quarantined']} | "
+        f"内容相同: {stats['identical']} (节省 {stats['bytes_saved'] / 1024 / 1024:.1f} MB)"
+    )
+
+class FileHandler(FileSystemEventHandler):
+    COPY_BUFFER_SIZE = 1024 * 1024  # 流式复制的块大小
+
+    def __init__(self, source_path, target_path, workers=4, queue_size=1000,
+                 quiet_period=0.2, ready_timeout=300.0, rules=None, journal=None,
+                 record_limit=10000, record_ttl=86400.0, pool=None,
+                 extensions=('.utf8',), recursive=False, name=None,
+                 scheduler=None, settle=0.1, committer=None, retry=None,
+                 dead_letter='', metrics=None, copies=(), index=None, archiver=None,
+                 validator=None):
+        self.source_path = source_path
+        self.target_path = target_path
+        self.name = name or source_path
+        self.extensions = tuple(ext.lower() for ext in extensions)  # 需要处理的文件扩展名
+        self.recursive = recursive
+        # 已处理文件和事件时间的记录有数量和时间上限，长期运行不会无限增长
+        self.processed_files = BoundedRecord(record_limit, record_ttl)  # 用于记录已处理的文件
+        self.processing_files = set()  # 用于记录正在处理的文件
+        self.last_event_time = BoundedRecord(record_limit, record_ttl)  # 用于记录文件最后一次事件时间
+        self.created_dirs = BoundedRecord(record_limit, record_ttl)  # 已确认存在的目标文件夹
+        self.stats = {
+            'total_processed': 0,
+            'modified': 0,
+            'moved': 0,
+            'renamed': 0,  # 无需修改、直接重命名的文件数
+            'errors': 0,
+            'dead': 0,  # 重试失败后移入死信文件夹的文件数
+            'quarantined': 0,  # 未通过内容校验、移入隔离文件夹的文件数
+            'identical': 0,  # 与目标文件内容相同、没有重写的文件数
+            'bytes_saved': 0  # 因内容相同没有提交的字节数
+        }
+        self.stats_lock = threading.Lock()
+        # 各处理阶段的耗时、吞吐量和错误统计，多个监控可共享
+        self.metrics = metrics if metrics is not None else Metrics()
+        # 用于判断文件是否已写入完成
+        self.readiness = ReadinessDetector(quiet_period=quiet_period, timeout=ready_timeout)
+        # 内容转换规则，未指定时使用内置的第7行规则
+        self.rules = rules or RuleEngine()
+        # 处理日志，用于重启后恢复未完成的移动（可选）
+        self.journal = journal
+        # 事件回调只负责入队，由处理池并发处理文件；多个监控可共享同一个处理池
+        self.owns_pool = pool is None
+        self.pool = pool or WorkerPool(self.handle_file, workers=workers, queue_size=queue_size)
+        self.pool.start()
+        # 各类事件先经过调度器合并，静默settle秒后才放入处理池
+        self.owns_scheduler = scheduler is None
+        self.scheduler = scheduler if scheduler is not None else CoalescingScheduler(settle=settle)
+        self.scheduler.start()
+        # 临时文件的持久化和提交方式，未指定时每个文件单独fsync
+        self.owns_committer = committer is None
+        self.committer = committer if committer is not None else CommitManager(metrics=self.metrics)
+        self.committer.start()
+        # 失败的文件按退避时间重试，重试次数用完后移入死信文件夹（为空时留在原处）
+        self.retry = retry if retry is not None else RetryQueue(self.scheduler)
+        self.dead_letter_path = dead_letter
+        self.pending_removal = {}  # 已提交、等待重试删除的源文件 -> (大小, 修改时间)
+        # 除target_path外还要写入的目标：源文件只读取和转换一次，同时写入所有目标
+        self.destinations = [Destination(target_path)] + list(copies)
+        # 目标文件的内容索引，内容相同时不再重写（可选）
+        self.index = index
+        # 处理前的源文件在删除前交给归档（可选），压缩在后台进行
+        self.archiver = archiver
+        # 写入目标之前在解析进程中解析和校验内容，不合格的文件移入隔离文件夹（可选）
+        self.validator = validator
+        self.copy_executor = None
+        if len(self.destinations) > 1:
+            self.copy_executor = ThreadPoolExecutor(
+                max_workers=self.pool.workers * (len(self.destinations) - 1),
+                thread_name_prefix='Copy'
+            )
+
+    def count(self, key, value=1):
+        """线程安全地累加统计项"""
+        with self.stats_lock:
+            self.stats[key] += value
+
+    def error(self, kind, error):
+        """记录一次处理错误，同时按类型计入指标"""
+        self.count('errors')
+        self.metrics.error(kind, error)
+
+    def get_stats(self):
+        """获取统计信息"""
+        return (
+            f"{format_stats(self.stats)} | "
+            f"队列: {self.pool.qsize()}/{self.pool.queue_size} | "
+            f"线程: {self.pool.workers} | "
+            f"记录: {self.processed_files.get_stats()} | "
+            f"{self.committer.get_stats()} | "
+            f"{self.retry.get_stats()} | "
+            + (f"{self.archiver.get_stats()} | " if self.archiver else "")
+            + (f"{self.validator.get_stats()} | " if self.validator else "") +
+            f"{self.metrics.get_stats()}"
+        )
+
+    def stop(self):
+        """停止自己创建的调度器、处理池和提交器，共享的由创建者停止"""
+        if self.owns_scheduler:
+            self.scheduler.stop()
+        if self.owns_pool:
+            self.pool.stop()
+        if self.owns_committer:
+            self.committer.stop()
+        if self.copy_executor:
+            self.copy_executor.shutdown(wait=False)
+
+    def accepts(self, file_path):
+        """是否是本监控需要处理的文件"""
+        # 忽略临时文件
+        if file_path.endswith('.tmp'):
+            return False
+        return file_path.lower().endswith(self.extensions)
+
+    def in_flight(self, file_path):
+        """文件是否已在等待检查、排队、处理或等待重试"""
+        return (file_path in self.processing_files
+                or self.scheduler.pending(file_path)
+                or self.pool.is_pending(file_path)
+                or self.retry.pending(file_path))
+
+    def record(self, source, state, target=None, temp=None):
+        """在处理日志中记录文件状态"""
+        if self.journal:
+            self.journal.record(source, state, target, temp)
+
+    def finish(self, source):
+        """从处理日志中移除已完成的文件"""
+        if self.journal:
+            self.journal.finish(source)
+
+    def recover(self):
+        """根据处理日志完成或回滚上次未完成的文件移动"""
+        if not self.journal:
+            return
+        
+        for source, target, temp, state in self.journal.pending():
+            self.recover_entry(source, target, temp, state)
+
+    def recover_entry(self, source, target, temp, state):
+        """完成或回滚处理日志中的一个文件"""
+        try:
+            # 多个目标时目标文件和临时文件用换行分隔
+            pairs = list(zip((target or '').split('\n'), (temp or '').split('\n')))
+            # 临时文件已完整写入：继续完成重命名（已重命名的目标没有临时文件）
+            if state == ProcessingJournal.STAGED and any(t and os.path.exists(t) for _, t in pairs):
+                for target_file, temp_file in pairs:
+                    if temp_file and os.path.exists(temp_file):
+                        os.replace(temp_file, target_file)
+                state = ProcessingJournal.COMMITTED
+            
+            if state == ProcessingJournal.COMMITTED:
+                # 目标文件已提交：只需删除源文件
+                if os.path.exists(source):
+                    self.keep_original(source)
+                    self.remove_source(source)
+                logging.info(f"已完成上次未完成的移动: {source} -> {', '.join(p[0] for p in pairs)}")
+            else:
+                for _, temp_file in pairs:
+                    if temp_file and os.path.exists(temp_file):
+                        # 临时文件未写完：删除，源文件稍后重新处理
+                        os.remove(temp_file)
+                        logging.info(f"已清理未完成的临时文件: {temp_file}")
+            
+            self.journal.finish(source)
+        except Exception as e:
+            logging.error(f"恢复未完成的移动失败: {source}: {str(e)}")
+
+    def clear_records(self):
+        """清理所有记录"""
+        self.processed_files.clear()
+        self.processing_files.clear()
+        self.last_event_time.clear()
+
+    def on_created(self, event):
+        # 只有创建、没有后续修改事件的文件
+        self.schedule_event(event.src_path, event.is_directory)
+
+    def on_modified(self, event):
+        self.schedule_event(event.src_path, event.is_directory)
+
+    def on_moved(self, event):
+        # 通过重命名到达的文件，处理重命名后的路径
+        self.schedule_event(event.dest_path, event.is_directory)
+
+    def on_closed(self, event):
+        # 写入方已关闭文件（仅部分平台支持），无需再等待静默时间
+        self.schedule_event(event.src_path, event.is_directory, delay=0, closed=True)
+
+    def schedule_event(self, file_path, is_directory, delay=None, closed=False):
+        """合并同一文件的连续事件，静默后检查文件是否写入完成"""
+        try:
+            current_time = time.time()
+            
+            # 忽略非文件事件
+            if is_directory:
+                return
+                
+            # 只处理配置的扩展名，忽略临时文件
+            if not self.accepts(file_path):
+                return
+                
+            self.last_event_time[file_path] = current_time
+            # 记录文件当前的大小和修改时间，之后的检查计入这段静默时间
+            self.readiness.observe(file_path, closed=closed)
+            
+            if file_path in self.processed_files:
+                logging.debug("文件曾被处理过，再次出现: %s", file_path)
+            
+            # 静默后在调度器中检查，写入完成才放入处理队列
+            self.scheduler.schedule(
+                file_path,
+                functools.partial(self.check_ready, file_path),
+                delay
+            )
+                
+        except Exception as e:
+            logging.error(f"处理文件事件时出错: {str(e)}", exc_info=True)
+
+    def check_ready(self, file_path, priority=LIVE):
+        """在调度器线程中检查文件是否写入完成
+
+        写入完成后放入处理池（已在队列或处理中的文件会被忽略），否则按
+        剩余的静默时间在调度器中安排下一次检查，不占用工作线程。
+        """
+        state, wait = self.readiness.check(file_path)
+        if state == WAITING:
+            self.scheduler.schedule(
+                file_path, functools.partial(self.check_ready, file_path, priority), wait
+            )
+        elif state == READY:
+            self.pool.submit(file_path, self.handle_file, priority)
+        else:
+            self.not_ready(file_path, state)
+
+    def not_ready(self, file_path, state):
+        if state == TIMEOUT:
+            self.metrics.error('timeout')
+            logging.warning(f"等待文件写入完成超时: {file_path}")
+        else:
+            logging.debug("文件不存在，可能已被处理: %s", file_path)
+
+    def handle_file(self, file_path, priority=LIVE):
+        """工作线程中处理单个文件"""
+        # 积压和重试的文件没有经过调度器检查，文件仍在写入时交回调度器
+        state, wait = self.readiness.check(file_path)
+        if state == WAITING:
+            self.scheduler.schedule(
+                file_path, functools.partial(self.check_ready, file_path, priority), wait
+            )
+            return
+        if state != READY:
+            self.not_ready(file_path, state)
+            return
+
+        # 标记文件正在处理
+        self.processing_files.add(file_path)
+        
+        try:
+            event_time = self.last_event_time.get(file_path)
+            self.metrics.observe('wait', time.time() - event_time if event_time else 0)
+            if self.awaiting_removal(file_path):
+                logging.debug("文件已提交，等待删除源文件: %s", file_path)
+                self.readiness.forget(file_path)
+                return
+            with self.metrics.timer('process'):
+                processed = self.process_file(file_path)
+            if processed:
+                self.processed_files.add(file_path)
+                self.readiness.forget(file_path)
+            elif os.path.exists(file_path):
+                # 保留观察记录，文件没有变化时重试不必再等待静默时间
+                self.retry_later(file_path)
+        finally:
+            # 处理完成后移除标记
+            self.processing_files.discard(file_path)
+
+    def read_head(self, src, count):
+        """读取文件前count行，保留原始换行符"""
+        head = []
+        for _ in range(count):
+            line = src.readline()
+            if not line:
+                break
+            head.append(line)
+        return head
+
+    def keep_original(self, file_path, link=True):
+        """源文件删除或移走之前交给归档
+
+        源文件随后会被删除时硬链接到暂存文件夹；会被重命名为目标文件时
+        （link为False）必须复制，否则归档的原始文件和交付的目标文件是同一个文件。
+        """
+        if self.archiver is not None:
+            self.archiver.add(file_path, self.name, self.relative_name(file_path), link)
+
+    def remove_source(self, file_path):
+        """删除源文件，失败时只记录日志"""
+        try:
+            with self.metrics.timer('delete'):
+                os.chmod(file_path, 0o777)  # 确保有删除权限
+                os.remove(file_path)
+            self.finish(file_path)
+            self.pending_removal.pop(file_path, None)
+            self.retry.succeeded(('remove', file_path))
+            logging.debug("成功删除源文件: %s", file_path)
+        except Exception as e:
+            self.metrics.error('delete', e)
+            logging.error(f"删除源文件失败: {str(e)}")
+            # 目标文件已提交，稍后只重试删除，不再重新处理
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                return
+            self.pending_removal[file_path] = (st.st_size, st.st_mtime_ns)
+            # 重试放入处理池执行，跨磁盘移入死信文件夹时不会阻塞调度器线程
+            self.retry.failed(
+                ('remove', file_path),
+                functools.partial(self.pool.submit, file_path, self.retry_remove),
+                functools.partial(self.move_to_dead_letter, file_path)
+            )
+
+    def awaiting_removal(self, file_path):
+        """源文件是否已提交、正在等待重试删除且之后没有被重新写入"""
+        signature = self.pending_removal.get(file_path)
+        if signature is None:
+            return False
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        return (st.st_size, st.st_mtime_ns) == signature
+
+    def retry_remove(self, file_path):
+        """重试删除已提交的源文件，源文件已变化时改为重新处理"""
+        if self.awaiting_removal(file_path):
+            self.remove_source(file_path)
+            return
+        # 已被删除，或已被重新写入需要重新处理
+        self.pending_removal.pop(file_path, None)
+        self.retry.succeeded(('remove', file_path))
+        if os.path.exists(file_path):
+            logging.info("源文件已被重新写入，重新处理: %s", file_path)
+            self.schedule_event(file_path, False)
+
+    def retry_later(self, file_path):
+        """处理失败的文件按退避时间重新放入处理队列"""
+        self.retry.failed(
+            file_path,
+            functools.partial(self.pool.submit, file_path, self.handle_file),
+            functools.partial(self.move_to_dead_letter, file_path)
+        )
+
+    def move_to_dead_letter(self, file_path):
+        """重试次数用完的源文件移入死信文件夹，按监控名称分开存放"""
+        self.pending_removal.pop(file_path, None)
+        if not self.dead_letter_path or not os.path.exists(file_path):
+            return
+        try:
+            folder = os.path.join(self.dead_letter_path, self.name)
+            os.makedirs(folder, exist_ok=True)
+            dead_file = os.path.join(folder, os.path.basename(file_path))
+            if os.path.exists(dead_file):
+                root, ext = os.path.splitext(dead_file)
+                dead_file = f"{root}.{time.strftime('%Y%m%d%H%M%S')}{ext}"
+            shutil.move(file_path, dead_file)
+            self.finish(file_path)
+            self.count('dead')
+            self.metrics.error('dead_letter')
+            logging.warning(f"文件已移入死信文件夹: {file_path} -> {dead_file}")
+        except Exception as e:
+            logging.error(f"移入死信文件夹失败: {file_path}: {str(e)}")
+
+    def validate(self, file_path):
+        """解析和校验文件内容，无需校验或校验通过时返回True
+
+        不合格的文件移入隔离文件夹，并在旁边写入不合格的原因；解析失败
+        （如读取出错）时抛出异常，文件稍后重试。
+        """
+        if self.validator is None or not self.validator.accepts(file_path):
+            return True
+        with self.metrics.timer('validate'):
+            summary = self.validator.validate(file_path)
+        if summary.valid:
+            logging.debug("解析完成: %s | %d 行, 样品 %s", file_path, summary.rows,
+                          ", ".join(summary.samples[:5]))
+            return True
+        self.count('quarantined')
+        self.metrics.error('invalid')
+        self.retry.succeeded(file_path)
+        if not self.validator.quarantine_path:
+            logging.warning(f"文件未通过校验，留在源文件夹: {file_path} | {summary.describe_errors()}")
+            return False
+        try:
+            folder = os.path.join(self.validator.quarantine_path, self.name)
+            os.makedirs(folder, exist_ok=True)
+            bad_file = os.path.join(folder, os.path.basename(file_path))
+            if os.path.exists(bad_file):
+                root, ext = os.path.splitext(bad_file)
+                bad_file = f"{root}.{time.strftime('%Y%m%d%H%M%S')}{ext}"
+            shutil.move(file_path, bad_file)
+            with open(bad_file + '.errors.txt', 'w', encoding='utf-8') as f:
+                f.write(f"源文件: {file_path}\n")
+                for number, message in summary.errors:
+                    f.write(f"第{number}行: {message}\n" if number else f"{message}\n")
+                if summary.invalid > len(summary.errors):
+                    f.write(f"等共{summary.invalid}处\n")
+            logging.warning(f"文件未通过校验，已移入隔离文件夹: {file_path} -> {bad_file} | "
+                            f"{summary.describe_errors()}")
+        except Exception as e:
+            logging.error(f"移入隔离文件夹失败: {file_path}: {str(e)}")
+        return False
+
+    def discard_temps(self, file_path, outputs):
+        """清理未提交的临时文件，源文件稍后重新处理"""
+        removed = False
+        for output in outputs:
+            if os.path.exists(output.temp):
+                try:
+                    os.remove(output.temp)
+                    removed = True
+                except:
+                    pass
+        if removed:
+            self.finish(file_path)
+
+    def record_outputs(self, source, state, outputs):
+        """在处理日志中记录必需目标的目标文件和临时文件，多个目标用换行分隔"""
+        required = [output for output in outputs if output.required]
+        self.record(
+            source, state,
+            '\n'.join(output.target for output in required),
+            '\n'.join(output.temp for output in required)
+        )
+
+    def commit(self, file_path, outputs, changes, digest=None, size=0):
+        """把写好的临时文件交给提交器，必需目标全部提交后再删除源文件
+
+        内容与目标文件相同的目标不再提交，直接视为已提交。
+        """
+        sources = [output.target for output in outputs if output.required]
+        fanout = FanOut(
+            outputs,
+            functools.partial(self.committed, file_path, outputs, changes),
+            functools.partial(self.copied, file_path, sources)
+        )
+        for output in outputs:
+            if output.identical:
+                self.count('bytes_saved', size)
+                fanout.committed(output, None)
+            elif output.error is None:
+                self.committer.commit(
+                    output.temp, output.target,
+                    functools.partial(self.output_committed, fanout, output, digest, size)
+                )
+            else:
+                # 写入失败的可选目标稍后从已提交的目标补写
+                self.metrics.error('copy', output.error)
+                self.copy_later(file_path, sources, output.target)
+
+    def output_committed(self, fanout, output, digest, size, error):
+        """一个目标提交完成，记录目标文件的内容摘要"""
+        if error is None and digest is not None:
+            try:
+                self.index.update(output.target, digest, size)
+            except Exception as e:
+                logging.error(f"更新内容索引失败: {output.target}: {str(e)}")
+        fanout.committed(output, error)
+
+    def committed(self, file_path, outputs, changes, errors):
+        """必需目标全部提交后删除源文件，有提交失败时清理临时文件"""
+        if errors:
+            self.error('commit', errors[0])
+            logging.error(f"提交文件失败: {file_path}: {str(errors[0])}")
+            self.discard_temps(file_path, [output for output in outputs if output.required])
+            self.retry_later(file_path)
+            return
+        self.record(file_path, ProcessingJournal.COMMITTED)
+        self.keep_original(file_path)
+        self.remove_source(file_path)
+        if outputs[0].identical:
+            self.count('identical')
+        self.moved(file_path, outputs[0].target, changes, outputs[0].identical)
+
+    def copied(self, file_path, sources, target, error):
+        """可选目标的提交结果，失败时稍后在后台补写，不影响源文件的删除"""
+        key = ('copy', target)
+        if error is None:
+            if self.retry.pending(key):
+                logging.info("已补写可选目标: %s", target)
+            self.retry.succeeded(key)
+            return
+        self.metrics.error('copy', error)
+        logging.warning(f"提交可选目标失败: {target}: {str(error)}")
+        try:
+            os.remove(target + '.tmp')
+        except OSError:
+            pass
+        self.copy_later(file_path, sources, target)
+
+    def copy_later(self, file_path, sources, target):
+        """按退避时间在后台补写可选目标，复制由处理池以积压文件的优先级执行"""
+        self.retry.failed(
+            ('copy', target),
+            functools.partial(
+                self.pool.submit, target,
+                functools.partial(self.retry_copy, file_path, sources), BACKLOG
+            )
+        )
+
+    def retry_copy(self, file_path, sources, target):
+        """从已提交的必需目标复制一份到可选目标"""
+        key = ('copy', target)
+        if not self.retry.pending(key):
+            # 源文件重新处理时已写入所有目标
+            return
+        if os.path.exists(file_path) and not self.awaiting_removal(file_path):
+            # 必需目标尚未提交（或源文件等待重新处理），稍后再试
+            self.copy_later(file_path, sources, target)
+            return
+        source = next((path for path in sources if os.path.exists(path)), None)
+        if source is None:
+            logging.error(f"无法补写可选目标，已提交的目标文件不存在: {target}")
+            self.retry.succeeded(key)
+            return
+
+        temp_file = target + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with self.metrics.timer('write'):
+                shutil.copyfile(source, temp_file)
+            with open(temp_file, 'rb+') as f:
+                self.committer.sync(f)
+        except Exception as e:
+            self.metrics.error('copy', e)
+            logging.warning(f"补写可选目标失败: {target}: {str(e)}")
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            self.copy_later(file_path, sources, target)
+            return
+        self.committer.commit(
+            temp_file, target,
+            functools.partial(self.copied, file_path, sources, target)
+        )
+
+    def moved(self, file_path, target_file, changes, identical=False):
+        """更新统计，每个文件只记录一条日志"""
+        self.retry.succeeded(file_path)
+        if changes:
+            self.count('modified')
+        logging.info("文件已处理: %s -> %s | %s%s", file_path, target_file, describe_changes(changes),
+                     " (与目标文件相同，未重写)" if identical else "")
+        
+        self.count('moved')
+        self.count('total_processed')
+
+    def move_unmodified(self, file_path, outputs):
+        """移动无需修改的文件（只有一个目标时）
+
+        源和目标在同一文件系统时直接原子重命名；否则交给shutil复制
+        （系统支持时由内核完成复制），再由提交器重命名并删除源文件。
+        """
+        output = outputs[0]
+        if self.same_device(file_path):
+            self.keep_original(file_path, link=False)
+            with self.metrics.timer('rename'):
+                os.replace(file_path, output.target)
+            self.count('renamed')
+            self.moved(file_path, output.target, None)
+            return
+        
+        self.record_outputs(file_path, ProcessingJournal.SEEN, outputs)
+        with self.metrics.timer('write'):
+            shutil.copyfile(file_path, output.temp)
+        with open(output.temp, 'rb+') as f:
+            synced = self.committer.sync(f)
+        if synced:
+            self.record(file_path, ProcessingJournal.STAGED)
+        self.commit(file_path, outputs, None)
+
+    def relative_name(self, file_path):
+        """目标文件相对于目标文件夹的路径，递归监控时保留子文件夹"""
+        if self.recursive:
+            return os.path.relpath(file_path, self.source_path)
+        return os.path.basename(file_path)
+
+    def ensure_dir(self, directory):
+        """创建目标文件夹，已确认存在的文件夹记在内存中，不再逐个文件检查"""
+        if directory in self.created_dirs:
+            return
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            logging.debug("创建目标目录: %s", directory)
+        self.created_dirs.add(directory)
+
+    def open_temp(self, temp_file):
+        """创建临时文件，所在的文件夹不存在时先创建"""
+        directory = os.path.dirname(temp_file)
+        self.ensure_dir(directory)
+        try:
+            return open(temp_file, 'wb')
+        except FileNotFoundError:
+            # 文件夹在记录之后被删除（例如按日期清理），重新创建
+            self.created_dirs.discard(directory)
+            self.ensure_dir(directory)
+            return open(temp_file, 'wb')
+
+    def same_device(self, file_path):
+        """源文件和目标文件夹是否在同一文件系统（可以直接重命名）"""
+        return os.stat(file_path).st_dev == os.stat(self.target_path).st_dev
+
+    def write_outputs(self, file_path, outputs, src, head, plan, changes):
+        """把头部和其余内容（分块复制或逐行转换）一次写入所有目标的临时文件
+
+        启用内容索引时在写入的同时计算摘要，与目标文件相同的目标在同步
+        之前放弃，返回 (摘要, 大小)。
+        """
+        self.record_outputs(file_path, ProcessingJournal.SEEN, outputs)
+        hasher = new_hasher() if self.index is not None else None
+        tee = TeeWriter(outputs, self.copy_executor, self.COPY_BUFFER_SIZE, hasher, self.open_temp)
+        digest = None
+        try:
+            tee.open()
+            with self.metrics.timer('write'):
+                tee.writelines(head)
+                if plan is not None and plan.every_line:
+                    plan.apply_rest(src, tee, len(head) + 1, changes)
+                else:
+                    shutil.copyfileobj(src, tee, self.COPY_BUFFER_SIZE)
+                tee.flush_chunk()
+            if hasher is not None:
+                digest = hasher.digest()[:DIGEST_SIZE]
+                for output in tee.live():
+                    if self.index.matches(output.target, digest, tee.size):
+                        tee.skip(output)
+            synced = tee.sync(self.committer)
+        finally:
+            tee.close()
+        # 只有已写入磁盘的临时文件才能在重启后继续提交
+        if synced:
+            self.record(file_path, ProcessingJournal.STAGED)
+        return digest, tee.size
+
+    def process_file(self, file_path):
+        try:
+            logging.debug("开始处理文件: %s", file_path)
+            
+            # 检查文件是否存在和可访问
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                logging.debug("文件不存在，可能已被处理: %s", file_path)
+                return False
+            
+            # 按配置解析和校验内容，不合格的文件不写入目标
+            try:
+                if not self.validate(file_path):
+                    return True
+            except Exception as e:
+                self.metrics.error('validate', e)
+                logging.error(f"解析文件失败: {file_path}: {str(e)}")
+                return False
+            
+            # 各目标的目标文件，写入新文件（目标文件.tmp）而不是修改原文件
+            name = self.relative_name(file_path)
+            outputs = [Output(destination, name) for destination in self.destinations]
+            # 检查目标目录
+            self.ensure_dir(os.path.dirname(outputs[0].target))
+            # 多个目标，或启用内容索引时需要复制的文件，都要读取内容写入临时文件
+            stream = len(outputs) > 1 or (self.index is not None and not self.same_device(file_path))
+            changes = []  # 修改的行：(行号, 原内容, 新内容)
+            
+            # 按文件名选出适用的规则，没有规则且可以直接移动的文件无需读取内容
+            self.rules.maybe_reload()
+            plan = self.rules.plan_for(os.path.basename(file_path))
+            staged = False  # 是否已写入临时文件
+            
+            try:
+                if plan is not None or stream:
+                    # 以二进制方式打开源文件，保留原始换行符
+                    try:
+                        src = open(file_path, 'rb')
+                    except Exception as e:
+                        self.metrics.error('read', e)
+                        logging.error(f"读取文件失败: {str(e)}")
+                        return False
+                    
+                    with src:
+                        # 只读取规则涉及的头部行
+                        head = []
+                        try:
+                            if plan is not None:
+                                with self.metrics.timer('read'):
+                                    head = self.read_head(src, plan.head_lines)
+                                with self.metrics.timer('transform'):
+                                    plan.apply_head(head, changes)
+                        except Exception as e:
+                            self.metrics.error('read', e)
+                            logging.error(f"读取文件失败: {str(e)}")
+                            return False
+                        
+                        if changes or stream or plan.every_line:
+                            # 写入头部，其余内容分块复制（或逐行转换）到各目标的临时文件
+                            digest, written = self.write_outputs(file_path, outputs, src, head, plan, changes)
+                            staged = True
+                
+                if staged:
+                    # 重命名临时文件（覆盖已存在的目标文件），提交后删除源文件
+                    self.commit(file_path, outputs, changes, digest, written)
+                else:
+                    # 无需修改的文件不再重写内容
+                    self.move_unmodified(file_path, outputs)
+                self.metrics.processed(size)
+                return True
+                
+            except Exception as e:
+                self.error('process', e)
+                logging.error(f"处理文件失败: {str(e)}")
+                # 清理临时文件
+                self.discard_temps(file_path, outputs)
+                if isinstance(e, FileNotFoundError):
+                    # 目标文件夹可能已被删除，下次重新检查
+                    for output in outputs:
+                        self.created_dirs.discard(os.path.dirname(output.target))
+                return False
+                
+        except Exception as e:
+            self.error('process', e)
+            logging.error(f"处理文件时出错: {str(e)}", exc_info=True)
+            return False
+
+class WatchRouter(FileSystemEventHandler):
+    """把同一个观察者收到的事件分发给对应的监控
+
+    按源文件夹建立索引：先查找文件所在目录，递归监控时再逐级向上查找，
+    查找次数只与目录深度有关，与监控数量无关。
+    """
+
+    def __init__(self):
+        self.index = {}  # 规范化的源文件夹 -> [FileHandler]（同一文件夹可按扩展名分给多个监控）
+        self.has_recursive = False
+
+    @staticmethod
+    def normalize(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def update(self, handlers):
+        """重建索引"""
+        index = {}
+        for handler in handlers:
+            index.setdefault(self.normalize(handler.source_path), []).append(handler)
+        self.index = index
+        self.has_recursive = any(h.recursive for h in handlers)
+
+    def candidates(self, file_path):
+        """按从近到远的顺序返回可能负责该路径的监控"""
+        directory = os.path.dirname(self.normalize(file_path))
+        found = list(self.index.get(directory, ()))
+        if not self.has_recursive:
+            return found
+        
+        # 递归监控：向上查找递归监控目录
+        while True:
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return found
+            directory = parent
+            found.extend(h for h in self.index.get(directory, ()) if h.recursive)
+
+    def find(self, file_path):
+        """返回负责该文件的监控（第一个接受该文件的），没有时返回None"""
+        for handler in self.candidates(file_path):
+            if handler.accepts(file_path):
+                return handler
+        return None
+
+    def dispatch(self, event):
+        # 重命名事件按重命名后的路径分发
+        file_path = event.dest_path if event.event_type == 'moved' else event.src_path
+        if event.is_directory:
+            # 监控只处理文件；移入的子文件夹中的文件由观察者另外产生创建事件，
+            # 漏掉的由定期扫描补充
+            return
+        handler = self.find(file_path)
+        if handler:
+            handler.dispatch(event)
+
+class TibasepathEngine:
+    """文件监控和处理引擎，不依赖图形界面
+
+    负责加载配置、启动观察者和处理池、处理源文件夹中已有的文件。
+    图形界面和无界面服务模式都通过它完成实际工作。
+
+    [Paths] 中的源/目标文件夹是第一个监控，其余监控写在 [Watch:名称] 段中。
+    所有监控共用一个观察者和一个处理池。
+    """
+
+    def __init__(self, config_file=CONFIG_FILE):
+        self.config_file = config_file
+        self.config = configparser.ConfigParser()
+        
+        # 创建事件处理器和观察者
+        self.handlers = []  # 每个监控一个FileHandler
+        self.router = WatchRouter()
+        self.pool = None
+        self.scheduler = None
+        self.reconciler = None
+        self.backlog = None
+        self.committer = None
+        self.retry = None
+        self.metrics = Metrics()
+        self.metrics_server = None
+        self.rules = None
+        self.journal = None
+        self.index = None
+        self.archiver = None
+        self.validator = None
+        self.observer = Observer()
+        self.observer.daemon = True
+
+    def load_config(self):
+        try:
+            if os.path.exists(self.config_file):
+                self.config.read(self.config_file, encoding='utf-8')
+                if 'Paths' not in self.config:
+                    self.config['Paths'] = {'source': '', 'target': ''}
+                
+                # 至少有一个监控的路径有效
+                for watch in self.get_watches():
+                    if os.path.exists(watch['source']) and os.path.exists(watch['target']):
+                        return True
+                logging.warning("配置文件中的路径无效或不存在")
+            else:
+                logging.info("配置文件不存在，使用默认配置")
+                
+            # 如果配置无效或不存在，清空源/目标文件夹等待重新设置
+            self.reset_paths()
+            return False
+        except Exception as e:
+            logging.error(f"加载配置文件失败: {str(e)}")
+            self.reset_paths()
+            return False
+
+    def reset_paths(self):
+        """清空 [Paths] 的源/目标文件夹，保留该段的其他设置（copies、recursive等）"""
+        if 'Paths' not in self.config:
+            self.config['Paths'] = {}
+        self.config['Paths']['source'] = ''
+        self.config['Paths']['target'] = ''
+
+    def get_watches(self):
+        """从配置中读取所有监控"""
+        watches = []
+        sections = [('Paths', 'Paths')] + [
+            (name, name.split(':', 1)[1]) for name in self.config.sections()
+            if name.startswith('Watch:')
+        ]
+        for section, name in sections:
+            if section not in self.config:
+                continue
+            options = self.config[section]
+            source_path = options.get('source', '')
+            target_path = options.get('target', '')
+            if not source_path or not target_path:
+                continue
+            watches.append({
+                'name': name,
+                'source': source_path,
+                'target': target_path,
+                'extensions': tuple(options.get('extensions', '.utf8').split()),
+                'recursive': options.getboolean('recursive', fallback=False),
+                # 同时写入的其他目标：必需目标全部写入后才删除源文件，可选目标失败时在后台补写
+                'copies': tuple(
+                    [Destination(path) for path in parse_paths(options.get('copies', ''))] +
+                    [Destination(path, required=False)
+                     for path in parse_paths(options.get('optional_copies', ''))]
+                )
+            })
+        return watches
+
+    def save_config(self, source_path, target_path):
+        """保存源文件夹和目标文件夹设置，[Paths] 中的其他设置保持不变"""
+        if 'Paths' not in self.config:
+            self.config['Paths'] = {}
+        self.config['Paths']['source'] = source_path
+        self.config['Paths']['target'] = target_path
+        with open(self.config_file, 'w', encoding='utf-8') as f:
+            self.config.write(f)
+
+    def create_handler(self, watch):
+        """为一个监控创建事件处理器，共享处理池、规则和处理日志"""
+        return FileHandler(
+            watch['source'], watch['target'],
+            quiet_period=self.config.getfloat('Processing', 'quiet_period', fallback=0.2),
+            ready_timeout=self.config.getfloat('Processing', 'ready_timeout', fallback=300.0),
+            rules=self.rules,
+            journal=self.journal,
+            record_limit=self.config.getint('Processing', 'record_limit', fallback=10000),
+            record_ttl=self.config.getfloat('Processing', 'record_ttl', fallback=86400.0),
+            pool=self.pool,
+            scheduler=self.scheduler,
+            committer=self.committer,
+            retry=self.retry,
+            metrics=self.metrics,
+            dead_letter=self.config.get('Processing', 'dead_letter', fallback='failed'),
+            extensions=watch['extensions'],
+            recursive=watch['recursive'],
+            copies=watch['copies'],
+            index=self.index,
+            archiver=self.archiver,
+            validator=self.validator,
+            name=watch['name']
+        )
+
+    def start_monitoring(self):
+        """启动监控，至少一个监控启动成功时返回True"""
+        watches = self.get_watches()
+        if not watches:
+            logging.warning("源目录或目标目录未设置")
+            return False
+
+        try:
+            # 所有监控共享的处理池、规则和处理日志只创建一次
+            if not self.pool:
+                self.pool = WorkerPool(
+                    workers=self.config.getint('Processing', 'workers', fallback=4),
+                    queue_size=self.config.getint('Processing', 'queue_size', fallback=1000)
+                )
+                self.pool.start()
+                self.scheduler = CoalescingScheduler(
+                    settle=self.config.getfloat('Processing', 'settle', fallback=0.1)
+                )
+                self.scheduler.start()
+                scan_workers = self.config.getint('Processing', 'scan_workers', fallback=8)
+                self.reconciler = Reconciler(
+                    interval=self.config.getfloat('Processing', 'rescan_interval', fallback=30.0),
+                    workers=scan_workers
+                )
+                self.backlog = BacklogDrain(
+                    self.pool,
+                    order=self.config.get('Processing', 'backlog_order', fallback='mtime'),
+                    scan_workers=scan_workers
+                )
+                self.committer = CommitManager(
+                    mode=self.config.get('Processing', 'durability', fallback='strict'),
+                    group_size=self.config.getint('Processing', 'group_size', fallback=32),
+                    group_interval=self.config.getfloat('Processing', 'group_interval', fallback=200) / 1000,
+                    metrics=self.metrics
+                )
+                self.committer.start()
+                self.retry = RetryQueue(
+                    self.scheduler,
+                    max_attempts=self.config.getint('Processing', 'retry_attempts', fallback=5),
+                    base_delay=self.config.getfloat('Processing', 'retry_delay', fallback=2.0),
+                    max_delay=self.config.getfloat('Processing', 'retry_max_delay', fallback=300.0)
+                )
+                self.rules = RuleEngine(self.config_file)
+                self.journal = self.open_journal()
+                self.index = self.open_index()
+                self.archiver = self.open_archive()
+                self.validator = self.open_validator()
+                self.start_metrics()
+                
+            # 配置未变化的监控沿用原来的处理器
+            existing = {
+                (h.name, h.source_path, h.target_path, h.extensions, h.recursive,
+                 tuple((d.path, d.required) for d in h.destinations[1:])): h
+                for h in self.handlers
+            }
+            handlers = []
+            for watch in watches:
+                if not os.path.exists(watch['source']):
+                    logging.warning(f"源目录不存在: {watch['source']}")
+                    continue
+                    
+                if not os.path.exists(watch['target']):
+                    try:
+                        os.makedirs(watch['target'])
+                        logging.info(f"创建目标目录: {watch['target']}")
+                    except Exception as e:
+                        logging.error(f"创建目标目录失败: {str(e)}")
+                        continue
+                
+                key = (watch['name'], watch['source'], watch['target'],
+                       tuple(ext.lower() for ext in watch['extensions']), watch['recursive'],
+                       tuple((d.path, d.required) for d in watch['copies']))
+                handlers.append(existing.get(key) or self.create_handler(watch))
+            
+            if not handlers:
+                return False
+            
+            first_start = not self.handlers
+            previous, self.handlers = self.handlers, handlers
+            self.router.update(handlers)
+            # 配置中删除或修改了的监控不再使用，释放其复制线程
+            for handler in previous:
+                if handler not in handlers:
+                    handler.stop()
+            if first_start:
+                # 完成上次未完成的文件移动（处理日志由所有监控共享，只需恢复一次）
+                self.recover()
+            
+            # 停止现有的监控
+            if self.observer.is_alive():
+                self.observer.unschedule_all()
+            
+            # 启动新的监控：同一个观察者，事件由路由分发
+            for handler in handlers:
+                self.observer.schedule(self.router, handler.source_path, recursive=handler.recursive)
+                logging.info(f"监控 {handler.name}: {handler.source_path} -> {handler.target_path}")
+            if not self.observer.is_alive():
+                self.observer.start()
+            
+            # 定期扫描源文件夹，补充观察者漏掉的文件
+            self.reconciler.update(handlers)
+            self.reconciler.start()
+            logging.info("文件监控已启动")
+            return True
+                
+        except Exception as e:
+            logging.error(f"启动监控失败: {str(e)}", exc_info=True)
+            return False
+
+    def recover(self):
+        """按源文件所属的监控恢复处理日志中未完成的文件"""
+        if not self.journal:
+            return
+        for source, target, temp, state in self.journal.pending():
+            # 配置中已删除的监控的文件由第一个监控完成（归档时的监控名称可能不准确）
+            handler = self.router.find(source) or self.handlers[0]
+            handler.recover_entry(source, target, temp, state)
+
+    def start_metrics(self):
+        """注册队列深度等即时指标，配置了端口时在本机提供指标服务"""
+        self.metrics.add_gauge('queue_depth', self.pool.qsize)
+        self.metrics.add_gauge('pending_events', lambda: len(self.scheduler))
+        self.metrics.add_gauge('pending_commits', self.committer.pending)
+        self.metrics.add_gauge('pending_retries', lambda: len(self.retry.attempts))
+        self.metrics.add_gauge('workers', lambda: self.pool.workers)
+        port = self.config.getint('Processing', 'metrics_port', fallback=0)
+        if port:
+            self.metrics_server = MetricsServer(self.metrics, port)
+            self.metrics_server.start()
+
+    def open_journal(self):
+        """打开处理日志，配置为空时不使用"""
+        journal_file = self.config.get('Processing', 'journal', fallback='tibasepath.db')
+        if not journal_file:
+            return None
+        try:
+            return ProcessingJournal(journal_file)
+        except Exception as e:
+            logging.error(f"打开处理日志失败: {str(e)}")
+            return None
+
+    def open_index(self):
+        """打开目标文件的内容索引（第一次使用时才读取），配置为空时不使用"""
+        index_file = self.config.get('Processing', 'content_index', fallback='tibasepath.index.db')
+        if not index_file:
+            return None
+        return ContentIndex(index_file)
+
+    def open_archive(self):
+        """启动源文件归档，配置为空时不归档"""
+        archive_path = self.config.get('Processing', 'archive', fallback='')
+        if not archive_path:
+            return None
+        archiver = Archiver(
+            archive_path,
+            fmt=self.config.get('Processing', 'archive_format', fallback='zip'),
+            cpu_budget=self.config.getfloat('Processing', 'archive_cpu', fallback=0.25),
+            queue_size=self.config.getint('Processing', 'archive_queue', fallback=10000)
+        )
+        try:
+            archiver.start()
+        except Exception as e:
+            logging.error(f"启动归档失败: {str(e)}")
+            return None
+        return archiver
+
+    def open_validator(self):
+        """按 [Validate] 段启动内容解析和校验，没有该段时不校验"""
+        if 'Validate' not in self.config:
+            return None
+        options = self.config['Validate']
+        try:
+            fmt = ExportFormat(
+                delimiter=options.get('delimiter', ','),
+                columns=options.getboolean('columns', fallback=False),
+                required=parse_names(options.get('required', '')),
+                sample_field=options.get('sample_field', '').strip(),
+                numeric=parse_names(options.get('numeric', '')),
+                min_rows=options.getint('min_rows', fallback=0)
+            )
+            validator = Validator(
+                fmt,
+                files=options.get('files', '*.utf8'),
+                processes=options.getint('processes', fallback=2),
+                chunk_size=int(options.getfloat('chunk_size', fallback=4) * 1024 * 1024),
+                cache_size=options.getint('cache_size', fallback=10000),
+                quarantine=options.get('quarantine', 'quarantine')
+            )
+            validator.start()
+        except Exception as e:
+            logging.error(f"启动内容校验失败: {str(e)}")
+            return None
+        return validator
+
+    def restart_monitoring(self):
+        try:
+            # 取消所有现有的监控
+            self.observer.unschedule_all()
+            # 重新开始监控
+            return self.start_monitoring()
+        except Exception as e:
+            logging.error(f"重启监控失败: {str(e)}", exc_info=True)
+            return False
+
+    def is_running(self):
+        """观察者是否在运行"""
+        return self.observer.is_alive()
+
+    def get_counters(self):
+        """所有监控的统计计数之和"""
+        totals = {}
+        for handler in self.handlers:
+            for key, value in handler.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def get_stats(self):
+        """获取统计信息"""
+        if not self.handlers:
+            return ""
+        if len(self.handlers) == 1:
+            return self.handlers[0].get_stats()
+        return (
+            f"{format_stats(self.get_counters())} | "
+            f"队列: {self.pool.qsize()}/{self.pool.queue_size} | "
+            f"线程: {self.pool.workers} | "
+            f"监控: {len(self.handlers)} | "
+            f"{self.committer.get_stats()} | "
+            f"{self.retry.get_stats()} | "
+            + (f"{self.archiver.get_stats()} | " if self.archiver else "")
+            + (f"{self.validator.get_stats()} | " if self.validator else "") +
+            f"{self.metrics.get_stats()}"
+        )
+
+    def stop(self):
+        """停止监控和处理池"""
+        if self.observer.is_alive():
+            self.observer.stop()
+            self.observer.join()
+        if self.backlog:
+            self.backlog.stop()
+        if self.reconciler:
+            self.reconciler.stop()
+        if self.scheduler:
+            self.scheduler.stop()
+        if self.pool:
+            self.pool.stop()
+        for handler in self.handlers:
+            handler.stop()
+        if self.validator:
+            self.validator.stop()
+        if self.committer:
+            # 等待中的文件提交完后才关闭处理日志
+            self.committer.stop()
+        if self.archiver:
+            self.archiver.stop()
+        if self.journal:
+            self.journal.close()
+        if self.index:
+            self.index.close()
+        if self.metrics_server:
+            self.metrics_server.stop()
+
+    def process_existing_files(self):
+        """在后台按配置的顺序处理各源文件夹中的现有文件"""
+        if self.backlog and self.handlers:
+            self.backlog.start(self.handlers)
+
+    def get_backlog_progress(self):
+        """积压文件的处理进度，没有积压时返回空字符串"""
+        return self.backlog.get_progress() if self.backlog else ""
+
+    def pause(self):
+        """暂停处理文件，新事件继续排队"""
+        if self.pool:
+            self.pool.pause()
+            logging.info("已暂停处理")
+        return self.is_paused()
+
+    def resume(self):
+        """恢复处理，并检查暂停期间可能因队列已满而漏掉的文件"""
+        if self.pool:
+            self.pool.resume()
+            logging.info("已恢复处理")
+            self.rescan()
+        return not self.is_paused()
+
+    def is_paused(self):
+        return bool(self.pool and self.pool.is_paused())
+
+    def rescan(self):
+        """在后台检查所有源文件夹中的文件"""
+        if not self.backlog or not self.handlers:
+            return False
+        logging.info("开始重新扫描源文件夹")
+        self.backlog.start(self.handlers)
+        return True
+
+    def reload(self):
+        """重新读取配置文件并重启监控
+
+        监控文件夹和规则立即生效；工作线程数、持久化方式等共享设置需要重启程序。
+        """
+        for section in self.config.sections():
+            self.config.remove_section(section)
+        self.load_config()
+        return self.restart_monitoring()
+
+    def is_drained(self):
+        """没有等待合并的事件、排队或处理中的文件和等待提交的文件（等待重试的不计）"""
+        if not self.pool:
+            return True
+        events = [
+            key for key in self.scheduler.keys()
+            if not (isinstance(key, tuple) and key[0] == 'retry')
+        ]
+        return not events and self.pool.is_idle() and not self.committer.pending()
+
+    def drain(self, timeout=None):
+        """停止接收新文件，处理完已排队的文件后停止引擎
+
+        返回是否在timeout秒内处理完。
+        """
+        logging.info("停止接收新文件，正在处理剩余文件")
+        if self.observer.is_alive():
+            self.observer.stop()
+            self.observer.join()
+        if self.backlog:
+            self.backlog.stop()
+        if self.reconciler:
+            self.reconciler.stop()
+        if self.pool:
+            self.pool.resume()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        drained = True
+        while not self.is_drained():
+            if deadline is not None and time.monotonic() > deadline:
+                drained = False
+                logging.warning("等待剩余文件处理完成超时")
+                break
+            time.sleep(0.1)
+        self.stop()
+        return drained
+
+    def get_status(self):
+        """控制通道查询的状态"""
+        return {
+            'running': self.is_running(),
+            'paused': self.is_paused(),
+            'counters': self.get_counters(),
+            'queue': self.pool.qsize() if self.pool else 0,
+            'backlog': self.get_backlog_progress(),
+            'watches': [
+                {'name': h.name, 'source': h.source_path, 'target': h.target_path,
+                 'copies': [d.path for d in h.destinations[1:]]}
+                for h in self.handlers
+            ],
+            'metrics': self.metrics.snapshot(),
+        }
+
+    def get_commands(self):
+        """控制通道可以调用的引擎命令，显示窗口和退出由界面或无界面模式补充"""
+        return {
+            'stats': self.get_status,
+            'pause': self.pause,
+            'resume': self.resume,
+            'rescan': self.rescan,
+            'reload': self.reload,
+        }
+
+def run_headless(config_file=CONFIG_FILE, stats_interval=60, control=None):
+    """无界面运行监控引擎，直到收到中断或终止信号
+
+    control是SingleInstance时同时提供本机控制通道。
+    """
+    setup_logger()
+    logging.info("程序启动（无界面模式）")
+    
+    engine = TibasepathEngine(config_file)
+    if not engine.load_config():
+        logging.error(f"配置无效，请检查 {config_file} 中的源文件夹和目标文件夹")
+        return 1
+    if not engine.start_monitoring():
+        return 1
+    # 在后台处理源文件夹中的现有文件
+    engine.process_existing_files()
+    
+    stop_event = threading.Event()
+    
+    def request_stop(signum, frame):
+        logging.info(f"收到信号 {signum}，正在停止")
+        stop_event.set()
+    
+    def drain_and_exit():
+        drained = engine.drain()
+        # 稍后再退出，先把应答发回给请求方
+        threading.Timer(0.5, stop_event.set).start()
+        return drained
+    
+    if control:
+        commands = engine.get_commands()
+        commands['show'] = lambda: "无界面模式，没有窗口"
+        commands['drain-exit'] = drain_and_exit
+        control.serve(commands)
+    
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    if hasattr(signal, 'SIGBREAK'):
+        signal.signal(signal.SIGBREAK, request_stop)
+    
+    # 定期把统计信息和积压处理进度写入日志
+    while not stop_event.wait(stats_interval):
+        logging.info(engine.get_stats())
+        progress = engine.get_backlog_progress()
+        if progress:
+            logging.info(progress)
+    
+    engine.stop()
+    logging.info("程序已退出")
+    return 0
@@ -0,0 +1,201 @@
+import os
+import re
+import logging
+import threading
+
+def parse_paths(value):
+    """配置中的多个文件夹，用分号或换行分隔（路径中可能有空格）"""
+    return [path.strip() for path in re.split(r'[;\n]', value or '') if path.strip()]
+
+def open_temp(temp_file):
+    os.makedirs(os.path.dirname(temp_file), exist_ok=True)
+    return open(temp_file, 'wb')
+
+class Destination:
+    """一个目标文件夹
+
+    必需目标全部提交后才删除源文件；可选目标失败不影响源文件的删除，
+    稍后在后台补写。
+    """
+
+    __slots__ = ('path', 'required')
+
+    def __init__(self, path, required=True):
+        self.path = path
+        self.required = required
+
+    def __repr__(self):
+        return f"Destination({self.path!r}, required={self.required})"
+
+class Output:
+    """一个源文件写入某个目标时的目标文件、临时文件和写入状态"""
+
+    __slots__ = ('destination', 'target', 'temp', 'file', 'error', 'identical')
+
+    def __init__(self, destination, name):
+        self.destination = destination
+        self.target = os.path.join(destination.path, name)
+        self.temp = self.target + '.tmp'
+        self.file = None
+        self.error = None  # 写入或提交失败的异常
+        self.identical = False  # 目标文件内容相同，不需要提交
+
+    @property
+    def required(self):
+        return self.destination.required
+
+class TeeWriter:
+    """把同一份内容写入多个目标的临时文件，源文件只读取和转换一次
+
+    只有一个目标时直接写入。多个目标时内容先累积到chunk_size，再由
+    executor并发写入各临时文件，整块写完才继续，内存中最多只有一块。
+    可选目标出错时关闭并放弃该目标，其余目标继续写入；必需目标出错时
+    抛出异常。指定hasher时同时计算写入内容的摘要。opener(临时文件)
+    负责创建临时文件（包括所在的文件夹）。
+    """
+
+    def __init__(self, outputs, executor=None, chunk_size=1024 * 1024, hasher=None, opener=None):
+        self.outputs = outputs
+        self.executor = executor
+        self.opener = opener or open_temp
+        self.chunk_size = chunk_size
+        self.hasher = hasher
+        self.size = 0  # 已写入的字节数
+        self.buffer = []
+        self.buffered = 0
+        self.single = None  # 只有一个目标时直接写入的文件
+
+    def open(self):
+        for output in self.outputs:
+            try:
+                output.file = self.opener(output.temp)
+            except Exception as e:
+                self.fail(output, e)
+        self.check()
+        if len(self.outputs) == 1:
+            self.single = self.outputs[0].file
+        return self
+
+    def live(self):
+        """尚未失败、需要提交的目标"""
+        return [output for output in self.outputs if output.error is None and not output.identical]
+
+    def write(self, data):
+        if self.hasher is not None:
+            self.hasher.update(data)
+        self.size += len(data)
+        if self.single is not None:
+            return self.single.write(data)
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= self.chunk_size:
+            self.flush_chunk()
+        return len(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush_chunk(self):
+        """把累积的内容写入所有目标"""
+        if not self.buffer:
+            return
+        data = b''.join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        outputs = self.live()
+        if self.executor and len(outputs) > 1:
+            # 其余目标由executor同时写入，当前线程写第一个目标
+            futures = [self.executor.submit(self.write_output, output, data) for output in outputs[1:]]
+            self.write_output(outputs[0], data)
+            for future in futures:
+                future.result()
+        else:
+            for output in outputs:
+                self.write_output(output, data)
+        self.check()
+
+    def write_output(self, output, data):
+        try:
+            output.file.write(data)
+        except Exception as e:
+            self.fail(output, e)
+
+    def sync(self, committer):
+        """写入剩余内容并按持久化模式同步，返回所有必需目标是否都已写入磁盘"""
+        self.flush_chunk()
+        synced = True
+        for output in self.live():
+            try:
+                if not committer.sync(output.file) and output.required:
+                    synced = False
+            except Exception as e:
+                self.fail(output, e)
+        self.check()
+        return synced
+
+    def check(self):
+        """必需目标出错时抛出异常"""
+        for output in self.outputs:
+            if output.error is not None and output.required:
+                raise output.error
+
+    def fail(self, output, error):
+        """放弃一个目标：关闭并删除它的临时文件"""
+        output.error = error
+        if output.required:
+            return
+        logging.warning(f"写入可选目标失败: {output.target}: {str(error)}")
+        self.close_output(output)
+        try:
+            os.remove(output.temp)
+        except OSError:
+            pass
+
+    def skip(self, output):
+        """目标文件内容相同：删除临时文件，不再同步和提交"""
+        output.identical = True
+        self.close_output(output)
+        try:
+            os.remove(output.temp)
+        except OSError:
+            pass
+
+    def close_output(self, output):
+        if output.file is not None:
+            try:
+                output.file.close()
+            except Exception:
+                pass
+            output.file = None
+
+    def close(self):
+        for output in self.outputs:
+            self.close_output(output)
+
+class FanOut:
+    """跟踪一个源文件各目标的提交
+
+    必需目标全部提交（或有失败）后调用 done(errors)；可选目标每个提交
+    完成后单独调用 optional(目标文件, error)，不等待也不影响源文件的删除。
+    """
+
+    def __init__(self, outputs, done, optional):
+        self.remaining = sum(1 for output in outputs if output.required)
+        self.done = done
+        self.optional = optional
+        self.errors = []
+        self.lock = threading.Lock()
+
+    def committed(self, output, error):
+        if not output.required:
+            self.optional(output.target, error)
+            return
+        with self.lock:
+            if error is not None:
+                output.error = error
+                self.errors.append(error)
+            self.remaining -= 1
+            finished = self.remaining == 0
+        if finished:
+            self.done(self.errors)
@@ -0,0 +1,475 @@
+import os
+import time
+import logging
+import sys
+from logger import setup_logger, log_buffer
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
+                            QHBoxLayout, QLabel, QLineEdit, QPushButton, 
+                            QTextEdit, QFileDialog, QMessageBox, QFrame,
+                            QSystemTrayIcon, QMenu, QAction)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QIcon, QFont
+from engine import TibasepathEngine, CONFIG_FILE
+
+class TibasepathGUI(QMainWindow):
+    # 控制通道在其他线程中收到命令，通过该信号把需要操作界面的函数交给界面线程执行
+    run_in_gui = pyqtSignal(object)
+
+    def __init__(self, config_file=CONFIG_FILE, control=None):
+        super().__init__()
+        # 初始化日志
+        setup_logger()
+        logging.info("程序启动")
+        
+        # 检查是否是开机启动
+        self.is_startup = self.check_startup_launch()
+        
+        # 监控和处理由引擎完成，界面只负责显示和设置
+        self.engine = TibasepathEngine(config_file)
+        config_valid = self.engine.load_config()
+        self.config = self.engine.config
+        
+        # 设置窗口
+        self.setWindowTitle("Tibasepath")
+        self.setWindowIcon(QIcon('metrohm.ico'))
+        
+        # 设置GUI
+        self.setup_gui()
+        
+        # 创建系统托盘
+        self.setup_tray()
+        
+        # 本机控制通道（再次启动程序时显示窗口、查询状态等）
+        self.run_in_gui.connect(self.call_in_gui, Qt.QueuedConnection)
+        if control:
+            control.serve(self.get_control_commands())
+        
+        # 开始监控（如果配置有效）
+        if config_valid:
+            self.start_monitoring()
+            # 在后台处理源文件夹中的现有文件，不阻塞界面
+            self.engine.process_existing_files()
+        else:
+            logging.warning("请在设置中配置有效的源文件夹和目标文件夹")
+            self.status_label.setText("请配置目录")
+            self.status_label.setStyleSheet("color: orange")
+        
+        # 开始定期更新日志显示
+        self.update_timer = QTimer()
+        self.update_timer.timeout.connect(self.update_log_display)
+        self.update_timer.start(1000)  # 每秒更新一次
+        
+        # 如果是开机启动，自动最小化到托盘
+        if self.is_startup:
+            QTimer.singleShot(1000, self.minimize_to_tray)  # 延迟1秒后最小化
+
+    def check_startup_launch(self):
+        """检查是否是开机启动"""
+        try:
+            import sys
+            import winreg
+            
+            # 获取注册表中的启动项
+            key = winreg.OpenKey(
+                winreg.HKEY_LOCAL_MACHINE,
+                r"SOFTWARE\Microsoft\Windows\CurrentVersion\Run",
+                0,
+                winreg.KEY_READ
+            )
+            
+            try:
+                value, _ = winreg.QueryValueEx(key, "Tibasepath")
+                # 检查当前程序路径是否与注册表中的路径匹配
+                if sys.executable in value:
+                    logging.info("程序通过开机启动项启动")
+                    return True
+            except WindowsError:
+                pass
+            finally:
+                winreg.CloseKey(key)
+            
+            # 检查启动文件夹
+            import os
+            startup_path = os.path.join(
+                os.environ["PROGRAMDATA"],
+                r"Microsoft\Windows\Start Menu\Programs\StartUp"
+            )
+            startup_link = os.path.join(startup_path, "Tibasepath.lnk")
+            
+            if os.path.exists(startup_link):
+                logging.info("程序通过启动文件夹启动")
+                return True
+                
+        except Exception as e:
+            logging.error(f"检查开机启动状态时出错: {str(e)}")
+        
+        return False
+
+    def minimize_to_tray(self):
+        """最小化到托盘"""
+        if hasattr(self, 'has_tray_support') and self.has_tray_support:
+            self.hide()  # 隐藏主窗口
+            self.is_minimized = True
+            if self.is_startup:
+                self.tray_icon.showMessage(
+                    "Tibasepath",
+                    "程序已在后台运行",
+                    QSystemTrayIcon.Information,
+                    2000
+                )
+        else:
+            self.showMinimized()  # 如果没有托盘支持，就只是最小化窗口
+
+    def setup_gui(self):
+        # 主窗口部件
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        
+        # 设置区域
+        settings_frame = QFrame()
+        settings_frame.setFrameStyle(QFrame.StyledPanel | QFrame.Raised)
+        settings_layout = QVBoxLayout(settings_frame)
+        
+        # 源文件夹设置
+        source_layout = QHBoxLayout()
+        source_layout.addWidget(QLabel("源文件夹:"))
+        self.source_entry = QLineEdit()
+        self.source_entry.setText(self.config['Paths'].get('source', ''))
+        source_layout.addWidget(self.source_entry)
+        browse_source_btn = QPushButton("浏览")
+        browse_source_btn.clicked.connect(self.browse_source)
+        source_layout.addWidget(browse_source_btn)
+        settings_layout.addLayout(source_layout)
+        
+        # 目标文件夹设置
+        target_layout = QHBoxLayout()
+        target_layout.addWidget(QLabel("目标文件夹:"))
+        self.target_entry = QLineEdit()
+        self.target_entry.setText(self.config['Paths'].get('target', ''))
+        target_layout.addWidget(self.target_entry)
+        browse_target_btn = QPushButton("浏览")
+        browse_target_btn.clicked.connect(self.browse_target)
+        target_layout.addWidget(browse_target_btn)
+        settings_layout.addLayout(target_layout)
+        
+        # 保存设置按钮
+        save_btn = QPushButton("保存设置")
+        save_btn.clicked.connect(self.save_settings)
+        save_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #007acc;
+                color: white;
+                padding: 5px 15px;
+                border: none;
+                border-radius: 3px;
+            }
+            QPushButton:hover {
+                background-color: #005999;
+            }
+        """)
+        settings_layout.addWidget(save_btn, alignment=Qt.AlignCenter)
+        
+        layout.addWidget(settings_frame)
+        
+        # 日志显示区域
+        self.log_text = QTextEdit()
+        self.log_text.setReadOnly(True)
+        self.log_text.setFont(QFont('Consolas', 9))
+        # 只保留最后的50行
+        self.log_text.document().setMaximumBlockCount(50)
+        self.last_log_sequence = 0  # 已显示的最新日志序号
+        self.log_text.setStyleSheet("""
+            QTextEdit {
+                background-color: #f5f5f5;
+                border: 1px solid #ddd;
+                padding: 5px;
+            }
+        """)
+        layout.addWidget(self.log_text)
+        
+        # 底部按钮区域
+        button_layout = QHBoxLayout()
+        clear_log_btn = QPushButton("清除日志")
+        clear_log_btn.clicked.connect(self.clear_log)
+        button_layout.addWidget(clear_log_btn)
+        
+        minimize_btn = QPushButton("最小化到托盘")
+        minimize_btn.clicked.connect(self.hide)
+        button_layout.addWidget(minimize_btn)
+        layout.addLayout(button_layout)
+        
+        # 状态栏
+        status_bar = self.statusBar()
+        self.status_label = QLabel("就绪")
+        status_bar.addWidget(self.status_label)
+        self.stats_label = QLabel("")
+        status_bar.addPermanentWidget(self.stats_label)
+        
+        # 设置窗口大小和位置
+        self.resize(800, 600)
+        self.center()
+
+    def center(self):
+        # 将窗口移动到屏幕中央
+        qr = self.frameGeometry()
+        cp = QApplication.desktop().availableGeometry().center()
+        qr.moveCenter(cp)
+        self.move(qr.topLeft())
+
+    def setup_tray(self):
+        # 创建系统托盘图标
+        self.tray_icon = QSystemTrayIcon(QIcon('metrohm.ico'), self)
+        tray_menu = QMenu()
+        
+        show_action = QAction("显示", self)
+        show_action.triggered.connect(self.show)
+        tray_menu.addAction(show_action)
+        
+        quit_action = QAction("退出", self)
+        quit_action.triggered.connect(self.quit_app)
+        tray_menu.addAction(quit_action)
+        
+        self.tray_icon.setContextMenu(tray_menu)
+        self.tray_icon.show()
+
+    def browse_source(self):
+        folder = QFileDialog.getExistingDirectory(self, "选择源文件夹")
+        if folder:
+            self.source_entry.setText(folder)
+
+    def browse_target(self):
+        folder = QFileDialog.getExistingDirectory(self, "选择目标文件夹")
+        if folder:
+            self.target_entry.setText(folder)
+
+    def save_settings(self):
+        source_path = self.source_entry.text()
+        target_path = self.target_entry.text()
+        
+        # 验证路径
+        if not source_path or not target_path:
+            QMessageBox.critical(self, "错误", "请设置源文件夹和目标文件夹")
+            return False
+        
+        if not os.path.exists(source_path):
+            QMessageBox.critical(self, "错误", f"源文件夹不存在: {source_path}")
+            return False
+        
+        if not os.path.exists(target_path):
+            QMessageBox.critical(self, "错误", f"目标文件夹不存在: {target_path}")
+            return False
+        
+        try:
+            # 保存配置
+            self.engine.save_config(source_path, target_path)
+            
+            # 重启监控
+            self.restart_monitoring()
+            QMessageBox.information(self, "成功", "设置已保存，监控已启动")
+            return True
+            
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"保存设置失败: {str(e)}")
+            logging.error(f"保存设置失败: {str(e)}")
+            return False
+
+    def start_monitoring(self):
+        self.show_monitoring_status(self.engine.start_monitoring())
+
+    def restart_monitoring(self):
+        self.show_monitoring_status(self.engine.restart_monitoring())
+
+    def show_monitoring_status(self, started):
+        """根据监控是否启动成功更新状态栏"""
+        if started:
+            self.status_label.setText("监控中")
+            self.status_label.setStyleSheet("color: green")
+            
+            # 更新统计信息
+            self.stats_label.setText(self.engine.get_stats())
+        else:
+            self.status_label.setText("启动失败")
+            self.status_label.setStyleSheet("color: red")
+
+    def clear_log(self):
+        try:
+            # 清空GUI显示
+            self.log_text.clear()
+            log_buffer.clear()
+            
+            # 清空日志文件
+            log_file = os.path.join("Logs", f"tibasepath_{time.strftime('%Y%m%d')}.log")
+            if os.path.exists(log_file):
+                # 备份旧日志
+                backup_file = log_file + '.bak'
+                try:
+                    if os.path.exists(backup_file):
+                        os.remove(backup_file)
+                    os.rename(log_file, backup_file)
+                except Exception as e:
+                    logging.error(f"备份日志文件失败: {str(e)}")
+                
+                # 创建新的日志文件
+                try:
+                    with open(log_file, 'w', encoding='utf-8') as f:
+                        f.write(f"=== 日志已清空 ({time.strftime('%Y-%m-%d %H:%M:%S')}) ===\n")
+                    logging.info("日志已清空")
+                except Exception as e:
+                    logging.error(f"创建新日志文件失败: {str(e)}")
+                    if os.path.exists(backup_file):
+                        os.rename(backup_file, log_file)
+            
+            # 重新初始化日志系统
+            setup_logger()
+            logging.info("日志系统已重新初始化")
+            
+            # 显示成功消息
+            QMessageBox.information(self, "成功", "日志已清空")
+            
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"清空日志失败: {str(e)}")
+            logging.error(f"清空日志失败: {str(e)}")
+
+    def update_log_display(self):
+        try:
+            # 窗口隐藏在托盘时不做任何更新
+            if not self.isVisible():
+                return
+            
+            # 只追加上次更新之后的新日志
+            self.last_log_sequence, lines = log_buffer.get_since(self.last_log_sequence)
+            if lines:
+                self.log_text.append('\n'.join(lines))
+                # 滚动到底部
+                self.log_text.verticalScrollBar().setValue(
+                    self.log_text.verticalScrollBar().maximum()
+                )
+            
+            # 更新状态和统计信息
+            if self.engine.is_running():
+                if self.engine.handlers:
+                    counters = self.engine.get_counters()
+                    progress = self.engine.get_backlog_progress()
+                    if self.engine.is_paused():
+                        self.status_label.setText("已暂停")
+                        self.status_label.setStyleSheet("color: orange")
+                    elif progress:
+                        # 正在处理积压文件时显示进度和预计剩余时间
+                        self.status_label.setText(progress)
+                        self.status_label.setStyleSheet("color: green")
+                    elif counters['total_processed'] > 0:
+                        self.status_label.setText("正在运行")
+                        self.status_label.setStyleSheet("color: green")
+                    else:
+                        self.status_label.setText("监控中")
+                        self.status_label.setStyleSheet("color: green")
+                    
+                    # 更新统计信息
+                    self.stats_label.setText(self.engine.get_stats())
+                    if counters['errors'] > 0:
+                        self.stats_label.setStyleSheet("color: red")
+                    else:
+                        self.stats_label.setStyleSheet("color: black")
+            else:
+                self.status_label.setText("已停止")
+                self.status_label.setStyleSheet("color: red")
+                
+        except Exception as e:
+            logging.error(f"更新显示时出错: {str(e)}")
+
+    def quit_app(self):
+        self.engine.stop()
+        QApplication.quit()
+
+    @pyqtSlot(object)
+    def call_in_gui(self, func):
+        """在界面线程中执行控制通道请求的操作"""
+        func()
+
+    def get_control_commands(self):
+        """控制通道的命令：引擎命令加上显示窗口和处理完剩余文件后退出"""
+        commands = self.engine.get_commands()
+        commands['show'] = self.request_show
+        commands['drain-exit'] = self.drain_and_exit
+        return commands
+
+    def request_show(self):
+        self.run_in_gui.emit(self.show_window)
+        return True
+
+    def show_window(self):
+        """从托盘或最小化状态恢复并激活窗口"""
+        self.show()
+        self.setWindowState(self.windowState() & ~Qt.WindowMinimized)
+        self.raise_()
+        self.activateWindow()
+
+    def drain_and_exit(self):
+        drained = self.engine.drain()
+        # 稍后再退出，先把应答发回给请求方
+        self.run_in_gui.emit(lambda: QTimer.singleShot(500, self.quit_app))
+        return drained
+
+    def showEvent(self, event):
+        # 从托盘恢复显示时立即补上隐藏期间的日志
+        super().showEvent(event)
+        self.update_log_display()
+
+    def closeEvent(self, event):
+        # 重写关闭事件，改为最小化到托盘
+        event.ignore()
+        self.hide()
+
+    def set_startup(self, enable=True):
+        """设置开机自启动"""
+        try:
+            import winreg
+            key_path = r"SOFTWARE\Microsoft\Windows\CurrentVersion\Run"
+            
+            # 打开注册表项
+            key = winreg.OpenKey(
+                winreg.HKEY_LOCAL_MACHINE,
+                key_path,
+                0,
+                winreg.KEY_SET_VALUE | winreg.KEY_QUERY_VALUE
+            )
+            
+            app_name = "Tibasepath"
+            exe_path = sys.executable
+            
+            try:
+                # 检查是否已经存在
+                existing_path = winreg.QueryValueEx(key, app_name)[0]
+                if existing_path == exe_path and enable:
+                    return  # 已经存在且路径相同，无需操作
+            except WindowsError:
+                pass  # 键不存在，继续添加
+            
+            if enable:
+                # 添加到启动项
+                winreg.SetValueEx(key, app_name, 0, winreg.REG_SZ, exe_path)
+                logging.info(f"已添加到开机启动项: {exe_path}")
+            else:
+                # 从启动项移除
+                try:
+                    winreg.DeleteValue(key, app_name)
+                    logging.info("已从开机启动项移除")
+                except WindowsError:
+                    pass
+                
+        except Exception as e:
+            logging.error(f"设置开机自启动失败: {str(e)}")
+        finally:
+            try:
+                winreg.CloseKey(key)
+            except:
+                pass
+
+def run_gui(config_file=CONFIG_FILE, control=None):
+    """以图形界面方式运行，control是SingleInstance时同时提供本机控制通道"""
+    app = QApplication(sys.argv)
+    app.setStyle('Fusion')
+    window = TibasepathGUI(config_file, control)
+    window.show()
+    return app.exec_()
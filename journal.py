@@ -0,0 +1,74 @@
+import time
+import logging
+import sqlite3
+import threading
+
+class ProcessingJournal:
+    """文件处理日志（SQLite WAL），用于崩溃或重启后恢复未完成的移动
+
+    每个文件的状态依次为：
+        seen      开始写入临时文件
+        staged    临时文件已写入并同步到磁盘
+        committed 临时文件已重命名为目标文件，等待删除源文件
+    源文件删除后记录即被移除，因此日志中只保留未完成的文件。
+    """
+
+    SEEN = 'seen'
+    STAGED = 'staged'
+    COMMITTED = 'committed'
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        # WAL模式下提交只追加日志，NORMAL级别在检查点时才同步磁盘
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'source TEXT PRIMARY KEY, target TEXT, temp TEXT, state TEXT, updated REAL)'
+        )
+
+    def record(self, source, state, target=None, temp=None):
+        """记录文件的状态变化
+
+        不使用 ON CONFLICT ... DO UPDATE（需要SQLite 3.24，Python 3.6自带的
+        版本可能更旧），先插入再更新，在同一个事务中提交。
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute('BEGIN')
+            try:
+                self.conn.execute(
+                    'INSERT OR IGNORE INTO entries (source, target, temp, state, updated) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (source, target, temp, state, now)
+                )
+                self.conn.execute(
+                    'UPDATE entries SET state = ?, updated = ?, '
+                    'target = COALESCE(?, target), temp = COALESCE(?, temp) WHERE source = ?',
+                    (state, now, target, temp, source)
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def finish(self, source):
+        """文件处理完成，移除记录"""
+        with self.lock:
+            self.conn.execute('DELETE FROM entries WHERE source = ?', (source,))
+
+    def pending(self):
+        """返回所有未完成的记录 (source, target, temp, state)"""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT source, target, temp, state FROM entries ORDER BY updated'
+            ).fetchall()
+
+    def close(self):
+        try:
+            with self.lock:
+                self.conn.close()
+        except Exception as e:
+            logging.error(f"关闭处理日志失败: {str(e)}")
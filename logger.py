@@ -1,11 +1,166 @@
 import os
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import RotatingFileHandler, QueueHandler
+from collections import deque
 import time
 
+class RingBufferHandler(logging.Handler):
+    """在内存中保留最近的日志记录，供界面增量显示"""
+
+    def __init__(self, capacity=50):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+        self.sequence = 0  # 最新一条记录的序号
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        # emit在处理器锁内调用
+        self.sequence += 1
+        self.records.append((self.sequence, message))
+
+    def get_since(self, sequence):
+        """返回 (最新序号, 序号大于sequence的日志列表)"""
+        self.acquire()
+        try:
+            lines = [message for seq, message in self.records if seq > sequence]
+            return self.sequence, lines
+        finally:
+            self.release()
+
+    def clear(self):
+        self.acquire()
+        try:
+            self.records.clear()
+        finally:
+            self.release()
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """按已写入的字节数判断滚动的日志文件，写入后不立即刷新
+
+    标准的RotatingFileHandler每条记录都要定位到文件末尾判断大小并刷新，
+    这里由后台写日志线程在每批记录之后统一调用flush。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.size = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+
+    def emit(self, record):
+        try:
+            message = self.format(record) + self.terminator
+            length = len(message.encode(self.encoding or 'utf-8'))
+            if self.maxBytes > 0 and self.size and self.size + length > self.maxBytes:
+                self.doRollover()
+                self.size = 0
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(message)
+            self.size += length
+        except Exception:
+            self.handleError(record)
+
+class BatchStreamHandler(logging.StreamHandler):
+    """写入后不立即刷新的控制台处理器"""
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+class LocalQueueHandler(QueueHandler):
+    """把日志记录放入同一进程内的队列
+
+    不需要跨进程传递，记录原样放入队列，消息格式化留给后台线程。
+    """
+
+    def prepare(self, record):
+        return record
+
+class BackgroundLogWriter:
+    """在后台线程把队列中的日志记录交给各处理器
+
+    每次取出队列中已有的全部记录（最多batch_size条）依次写入，
+    一批写完后每个处理器只刷新一次。
+    """
+
+    def __init__(self, handlers, batch_size=500):
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='LogWriter', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """写完队列中剩余的记录后停止"""
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        for handler in self.handlers:
+            if handler is not log_buffer:
+                handler.close()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = False
+            for record in batch:
+                if record is None:
+                    stopping = True
+                    continue
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except Exception:
+                    pass
+            if stopping:
+                return
+
+# 界面日志显示使用的内存缓冲区，重新初始化日志系统时保持不变
+log_buffer = RingBufferHandler()
+# 当前的后台写日志线程
+log_writer = None
+
+def stop_logger():
+    """写完剩余的日志并停止后台写日志线程"""
+    global log_writer
+    if log_writer:
+        logging.getLogger().handlers.clear()
+        log_writer.stop()
+        log_writer = None
+
+atexit.register(stop_logger)
+
 def setup_logger():
-    """设置日志记录器"""
+    """设置日志记录器
+
+    根日志记录器只把记录放入队列，文件、控制台和界面缓冲区由后台线程写入，
+    处理文件的线程不会因写日志而阻塞。
+    """
+    global log_writer
     try:
+        # 重新初始化时先写完并关闭原来的日志文件
+        stop_logger()
+        
         # 创建logs目录（如果不存在）
         if not os.path.exists('Logs'):
             os.makedirs('Logs')
@@ -20,7 +175,7 @@ def setup_logger():
         )
         
         # 创建文件处理器（限制单个文件大小为5MB，最多保留5个备份）
-        file_handler = RotatingFileHandler(
+        file_handler = BatchRotatingFileHandler(
             log_file,
             maxBytes=5*1024*1024,  # 5MB
             backupCount=5,
@@ -29,9 +184,12 @@ def setup_logger():
         file_handler.setFormatter(formatter)
         
         # 创建控制台处理器
-        console_handler = logging.StreamHandler()
+        console_handler = BatchStreamHandler()
         console_handler.setFormatter(formatter)
         
+        # 内存缓冲区，界面只需读取新增的记录
+        log_buffer.setFormatter(formatter)
+        
         # 配置根日志记录器
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.INFO)
@@ -39,9 +197,10 @@ def setup_logger():
         # 清除现有的处理器
         root_logger.handlers.clear()
         
-        # 添加处理器
-        root_logger.addHandler(file_handler)
-        root_logger.addHandler(console_handler)
+        # 添加处理器：由后台线程写入文件、控制台和界面缓冲区
+        log_writer = BackgroundLogWriter([file_handler, console_handler, log_buffer])
+        log_writer.start()
+        root_logger.addHandler(LocalQueueHandler(log_writer.queue))
         
         logging.info('日志系统初始化完成')
         
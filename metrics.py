@@ -0,0 +1,266 @@
+import json
+import time
+import bisect
+import logging
+import threading
+from collections import deque
+from socketserver import ThreadingMixIn
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# 处理阶段：事件到写入完成的等待、读取、转换、写入、fsync、重命名、删除源文件、
+# 工作线程处理单个文件的总时间、group模式下从写完到提交的等待、解析校验内容
+STAGES = ('wait', 'read', 'transform', 'write', 'fsync', 'rename', 'delete', 'process', 'commit',
+          'validate')
+
+class Histogram:
+    """固定分桶的耗时直方图（秒），分位数在桶内线性插值估算"""
+
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+               0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)  # 最后一个桶是 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """估算分位数，没有数据时返回0"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                if i == len(self.BUCKETS):
+                    return self.BUCKETS[-1]
+                lower = self.BUCKETS[i - 1] if i else 0.0
+                return lower + (self.BUCKETS[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.BUCKETS[-1]
+
+class Metrics:
+    """各处理阶段的耗时、吞吐量和错误统计
+
+    耗时按阶段记录在直方图中；吞吐量按秒累计，速率取最近window秒的
+    平均值。队列深度等即时数值通过add_gauge注册的函数在读取时获取。
+    """
+
+    def __init__(self, window=60):
+        self.window = window
+        self.lock = threading.Lock()
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.files = 0
+        self.bytes = 0
+        self.errors = {}  # (类型, 异常类名) -> 次数
+        self.recent = deque()  # [秒, 文件数, 字节数]
+        self.gauges = {}  # 名称 -> 返回当前值的函数
+        self.started = time.time()
+
+    def observe(self, stage, seconds):
+        """记录一个阶段的耗时"""
+        with self.lock:
+            self.histograms[stage].observe(seconds)
+
+    def timer(self, stage):
+        """用with语句记录代码块的耗时"""
+        return StageTimer(self, stage)
+
+    def processed(self, size):
+        """记录一个处理完的文件及其大小"""
+        second = int(time.time())
+        with self.lock:
+            self.files += 1
+            self.bytes += size
+            if self.recent and self.recent[-1][0] == second:
+                self.recent[-1][1] += 1
+                self.recent[-1][2] += size
+            else:
+                self.recent.append([second, 1, size])
+            self._trim(second)
+
+    def error(self, kind, error=None):
+        """按类型（读取、处理、提交、删除等）和异常类记录错误"""
+        key = (kind, type(error).__name__ if error is not None else '')
+        with self.lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def add_gauge(self, name, getter):
+        """注册即时数值，例如队列深度"""
+        self.gauges[name] = getter
+
+    def _trim(self, now):
+        while self.recent and self.recent[0][0] <= now - self.window:
+            self.recent.popleft()
+
+    def rates(self):
+        """最近window秒内的 (文件/秒, 字节/秒)"""
+        now = int(time.time())
+        with self.lock:
+            self._trim(now)
+            files = sum(item[1] for item in self.recent)
+            size = sum(item[2] for item in self.recent)
+        span = min(self.window, max(1, now - int(self.started)))
+        return files / span, size / span
+
+    def read_gauges(self):
+        values = {}
+        for name, getter in list(self.gauges.items()):
+            try:
+                values[name] = getter()
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self):
+        """JSON快照"""
+        files_rate, bytes_rate = self.rates()
+        with self.lock:
+            stages = {
+                stage: {
+                    'count': h.count,
+                    'sum': round(h.sum, 6),
+                    'p50': round(h.quantile(0.5), 6),
+                    'p95': round(h.quantile(0.95), 6),
+                    'p99': round(h.quantile(0.99), 6),
+                }
+                for stage, h in self.histograms.items()
+            }
+            errors = [
+                {'kind': kind, 'exception': exception, 'count': n}
+                for (kind, exception), n in sorted(self.errors.items())
+            ]
+            files, size = self.files, self.bytes
+        return {
+            'uptime': round(time.time() - self.started, 1),
+            'files': files,
+            'bytes': size,
+            'files_per_second': round(files_rate, 3),
+            'bytes_per_second': round(bytes_rate, 1),
+            'stages': stages,
+            'errors': errors,
+            'gauges': self.read_gauges(),
+        }
+
+    def prometheus(self):
+        """Prometheus文本格式"""
+        files_rate, bytes_rate = self.rates()
+        lines = [
+            '# HELP tibasepath_stage_seconds Time spent in each processing stage.',
+            '# TYPE tibasepath_stage_seconds histogram',
+        ]
+        with self.lock:
+            for stage, h in self.histograms.items():
+                cumulative = 0
+                for bound, n in zip(Histogram.BUCKETS, h.counts):
+                    cumulative += n
+                    lines.append(f'tibasepath_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'tibasepath_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'tibasepath_stage_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'tibasepath_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            lines += [
+                '# TYPE tibasepath_files_total counter',
+                f'tibasepath_files_total {self.files}',
+                '# TYPE tibasepath_bytes_total counter',
+                f'tibasepath_bytes_total {self.bytes}',
+                '# TYPE tibasepath_errors_total counter',
+            ]
+            for (kind, exception), n in sorted(self.errors.items()):
+                lines.append(f'tibasepath_errors_total{{kind="{kind}",exception="{exception}"}} {n}')
+        lines += [
+            '# TYPE tibasepath_files_per_second gauge',
+            f'tibasepath_files_per_second {files_rate:.3f}',
+            '# TYPE tibasepath_bytes_per_second gauge',
+            f'tibasepath_bytes_per_second {bytes_rate:.1f}',
+        ]
+        for name, value in self.read_gauges().items():
+            lines.append(f'# TYPE tibasepath_{name} gauge')
+            lines.append(f'tibasepath_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def get_stats(self):
+        """状态栏显示的摘要"""
+        files_rate, bytes_rate = self.rates()
+        with self.lock:
+            p95 = self.histograms['process'].quantile(0.95)
+        return (
+            f"速率: {files_rate:.1f} 个/秒 ({bytes_rate / 1024 / 1024:.2f} MB/秒) | "
+            f"处理p95: {p95 * 1000:.0f} 毫秒"
+        )
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """每个请求一个线程（Python 3.6没有http.server.ThreadingHTTPServer）"""
+    daemon_threads = True
+
+class StageTimer:
+    """Metrics.timer返回的计时器"""
+
+    __slots__ = ('metrics', 'stage', 'started')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+class MetricsServer:
+    """在本机提供 /metrics（Prometheus文本格式）和 /metrics.json（JSON快照）"""
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        self.metrics = metrics
+        self.address = (host, port)
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        if self.server:
+            return True
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body = metrics.prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/metrics.json':
+                    body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug("指标请求: %s", format % args)
+
+        try:
+            self.server = ThreadingHTTPServer(self.address, Handler)
+        except OSError as e:
+            logging.error(f"启动指标服务失败: {self.address[0]}:{self.address[1]}: {str(e)}")
+            return False
+        self.thread = threading.Thread(target=self.server.serve_forever, name='Metrics', daemon=True)
+        self.thread.start()
+        logging.info(f"指标服务: http://{self.address[0]}:{self.address[1]}/metrics")
+        return True
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
@@ -0,0 +1,116 @@
+import os
+import time
+from bounded_record import BoundedRecord
+
+# check() 的结果
+READY = 'ready'  # 写入完成
+WAITING = 'waiting'  # 仍在写入或静默时间不足
+TIMEOUT = 'timeout'  # 超过最长等待时间
+GONE = 'gone'  # 文件已不存在
+
+def is_unlocked(file_path):
+    """检查写入方是否已经释放文件
+
+    Windows下写入方未关闭文件时，以读写方式打开会因共享冲突失败；
+    其他系统没有强制锁，直接视为已释放。
+    """
+    if os.name != 'nt':
+        return True
+    if not os.access(file_path, os.W_OK):
+        # 只读文件不会处于写入中
+        return True
+    try:
+        fd = os.open(file_path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return False
+    os.close(fd)
+    return True
+
+class ReadinessDetector:
+    """检测文件是否已写入完成
+
+    文件大小和修改时间在静默期内保持不变且文件未被占用时视为写入完成。
+    只按本机观察到的不变时长判断，不与文件的修改时间比较（文件服务器
+    的时钟可能不同，复制工具也可能保留原来的修改时间）。
+
+    check()不阻塞：每次观察都记录下来，下次检查时计入已经过去的静默
+    时间，调用方按返回的等待时间安排下一次检查。
+    """
+
+    def __init__(self, quiet_period=0.2, timeout=300.0,
+                 initial_delay=0.01, max_delay=1.0, max_files=100000):
+        self.quiet_period = quiet_period  # 文件保持不变多久视为写入完成（秒）
+        self.timeout = timeout  # 最长等待时间（秒），0表示不限制
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        # 文件 -> (大小和修改时间, 开始保持不变的时间, 首次观察的时间)
+        self.observations = BoundedRecord(max_files, ttl=0)
+
+    def observe(self, file_path, st=None, closed=False):
+        """记录一次观察（事件到达或扫描时），st为已有的stat结果
+
+        closed为真表示写入方已关闭文件，无需再等待静默时间。
+        """
+        if st is None:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                return
+        now = time.monotonic()
+        signature = (st.st_size, st.st_mtime_ns)
+        previous = self.observations.get(file_path)
+        first_seen = previous[2] if previous else now
+        if closed:
+            stable_since = now - self.quiet_period
+        elif previous and previous[0] == signature:
+            stable_since = previous[1]
+        else:
+            stable_since = now
+        self.observations[file_path] = (signature, stable_since, first_seen)
+
+    def forget(self, file_path):
+        """文件处理完成或放弃后删除观察记录"""
+        self.observations.discard(file_path)
+
+    def check(self, file_path):
+        """检查一次文件状态，返回 (结果, 下次检查前应等待的秒数)"""
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            self.forget(file_path)
+            return GONE, 0
+
+        now = time.monotonic()
+        signature = (st.st_size, st.st_mtime_ns)
+        previous = self.observations.get(file_path)
+        if previous is None or previous[0] != signature:
+            # 文件有变化，重新开始计时
+            first_seen = previous[2] if previous else now
+            stable_since = now
+            self.observations[file_path] = (signature, stable_since, first_seen)
+        else:
+            _, stable_since, first_seen = previous
+
+        # 静默时间：本机观察到大小和修改时间保持不变的时长
+        quiet = now - stable_since
+        if quiet >= self.quiet_period and is_unlocked(file_path):
+            # 保留观察记录，处理前再次检查时文件没有变化仍然就绪
+            return READY, 0
+
+        if self.timeout and now - first_seen >= self.timeout:
+            self.forget(file_path)
+            return TIMEOUT, 0
+
+        if quiet < self.quiet_period:
+            return WAITING, max(self.quiet_period - quiet, self.initial_delay)
+        # 静默时间已够但文件仍被占用
+        return WAITING, self.max_delay
+
+    def wait_until_ready(self, file_path):
+        """阻塞等待文件写入完成，文件消失或超时返回False"""
+        while True:
+            state, wait = self.check(file_path)
+            if state != WAITING:
+                self.forget(file_path)
+                return state == READY
+            time.sleep(wait)
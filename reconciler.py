@@ -0,0 +1,133 @@
+import os
+import time
+import logging
+import threading
+import functools
+from treewalk import walk_parallel
+
+# 文件夹修改时间距今不足该值（秒）时不作为跳过依据，避免时间精度较粗的文件系统漏掉新文件
+MTIME_SETTLE = 2.0
+
+class Reconciler:
+    """定期扫描源文件夹，补充处理观察者漏掉事件的文件
+
+    每次用os.scandir生成 文件名 -> (大小, 修改时间) 的快照，与上一次
+    快照比较，只把新出现或有变化的文件交给对应的监控。文件夹本身的
+    修改时间未变化时跳过该文件夹；有变化时重新读取其中每个文件的大小
+    和修改时间（同名文件被删除后重新导出时文件名不变）。递归监控时每个
+    子文件夹单独记录快照，由workers个线程并行扫描。
+    """
+
+    def __init__(self, interval=30.0, name='Reconciler', workers=4):
+        self.interval = interval
+        self.name = name
+        self.workers = workers
+        self.handlers = []
+        # (监控名称, 文件夹) -> (文件夹修改时间, {文件名: (大小, 修改时间)}, [子文件夹])
+        # 快照只包含该监控接受的文件，多个监控共用一个源文件夹时各自记录
+        self.snapshots = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.found = 0  # 扫描中发现的新文件数
+
+    def update(self, handlers):
+        """设置需要扫描的监控
+
+        新的源文件夹由扫描线程先记录基准快照，不在调用者（图形界面）的
+        线程中遍历文件夹；基准快照之前已有的文件由积压处理负责。
+        """
+        self.handlers = list(handlers)
+
+    def start(self):
+        if self.thread or not self.interval:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _run(self):
+        self.scan_all()
+        while not self.stop_event.wait(self.interval):
+            self.scan_all()
+
+    def scan_all(self):
+        """扫描所有监控，还没有快照的源文件夹只记录基准快照"""
+        for handler in self.handlers:
+            if self.stop_event.is_set():
+                return
+            try:
+                self.scan(handler, enqueue=(handler.name, handler.source_path) in self.snapshots)
+            except Exception as e:
+                logging.error(f"扫描源文件夹失败: {handler.source_path}: {str(e)}")
+
+    def scan(self, handler, enqueue=True):
+        """扫描一个源文件夹（递归监控时包括所有子文件夹），返回新出现或有变化的文件数"""
+        source_path = handler.source_path
+        changed = []
+        visited = set()
+        visit = functools.partial(self.scan_directory, handler)
+        for directory, found in walk_parallel(source_path, visit, handler.recursive, self.workers):
+            visited.add(directory)
+            changed.extend(found)
+
+        if handler.recursive:
+            # 已删除的子文件夹不再保留快照
+            prefix = os.path.join(source_path, '')
+            for key in [k for k in self.snapshots
+                        if k[0] == handler.name and k[1].startswith(prefix) and k[1] not in visited]:
+                del self.snapshots[key]
+
+        if enqueue:
+            # 已在等待检查、排队或处理中的文件（例如仍在写入）不重复安排
+            changed = [file_path for file_path in changed if not handler.in_flight(file_path)]
+            for file_path in changed:
+                logging.info("扫描发现未处理的文件: %s", file_path)
+                handler.schedule_event(file_path, False)
+            self.found += len(changed)
+        return len(changed)
+
+    def scan_directory(self, handler, directory):
+        """扫描一个文件夹，返回 (新出现或有变化的文件, 子文件夹)"""
+        dir_stat = os.stat(directory)
+        dir_mtime = dir_stat.st_mtime_ns
+
+        previous_mtime, previous, subdirs = self.snapshots.get((handler.name, directory), (None, {}, []))
+        # 文件夹未变化：没有新增、删除或重命名的文件和子文件夹
+        if dir_mtime == previous_mtime:
+            return [], subdirs
+
+        snapshot = {}
+        subdirs = []
+        changed = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                except OSError:
+                    continue
+                if not handler.accepts(entry.path):
+                    continue
+                old_signature = previous.get(entry.name)
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                signature = (st.st_size, st.st_mtime_ns)
+                snapshot[entry.name] = signature
+                if signature != old_signature:
+                    changed.append(entry.path)
+
+        if time.time() - dir_stat.st_mtime < MTIME_SETTLE:
+            dir_mtime = None
+        self.snapshots[(handler.name, directory)] = (dir_mtime, snapshot, subdirs)
+        return changed, subdirs
@@ -0,0 +1,60 @@
+import logging
+import threading
+
+class RetryQueue:
+    """失败操作的重试队列
+
+    每个键单独计算失败次数，第n次失败后等待 base_delay * 2^(n-1) 秒
+    （不超过max_delay）再重试。等待中的重试放在调度器的定时堆中，
+    不占用线程；失败次数超过max_attempts时调用放弃时的回调。
+    """
+
+    def __init__(self, scheduler, max_attempts=5, base_delay=2.0, max_delay=300.0):
+        self.scheduler = scheduler
+        self.max_attempts = max(0, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts = {}  # 键 -> 连续失败次数
+        self.lock = threading.Lock()
+        self.retried = 0  # 已安排的重试次数
+        self.abandoned = 0  # 放弃的键数
+
+    def failed(self, key, action, give_up=None):
+        """记录一次失败，安排重试时返回True，已放弃时返回False"""
+        with self.lock:
+            attempt = self.attempts.get(key, 0) + 1
+            if attempt > self.max_attempts:
+                self.attempts.pop(key, None)
+                self.abandoned += 1
+            else:
+                self.attempts[key] = attempt
+                self.retried += 1
+
+        if attempt > self.max_attempts:
+            logging.error(f"重试 {self.max_attempts} 次后仍然失败，放弃: {key}")
+            if give_up:
+                try:
+                    give_up()
+                except Exception as e:
+                    logging.error(f"放弃重试时出错: {str(e)}", exc_info=True)
+            return False
+
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        logging.info("%g 秒后第 %d 次重试: %s", delay, attempt, key)
+        self.scheduler.schedule(('retry', key), action, delay)
+        return True
+
+    def succeeded(self, key):
+        """操作成功，清除失败次数"""
+        with self.lock:
+            self.attempts.pop(key, None)
+
+    def pending(self, key):
+        """是否有等待中的重试"""
+        with self.lock:
+            return key in self.attempts
+
+    def get_stats(self):
+        with self.lock:
+            waiting = len(self.attempts)
+        return f"重试: 等待 {waiting} / 放弃 {self.abandoned}"
@@ -0,0 +1,228 @@
+import os
+import re
+import time
+import fnmatch
+import logging
+import threading
+import configparser
+
+# 配置文件中没有任何规则时使用的内置规则：第7行的6改为6.（已包含6.时不修改）
+DEFAULT_RULES = {
+    'line7': {
+        'files': '*.utf8',
+        'line': '7',
+        'pattern': '6',
+        'replace': '6.',
+        'unless': r'6\.'
+    }
+}
+
+def parse_lines(value):
+    """解析行号配置：'7' 或 '1-20'，空值表示所有行"""
+    value = value.strip()
+    if not value:
+        return None
+    if '-' in value:
+        first, last = value.split('-', 1)
+        first, last = int(first), int(last)
+    else:
+        first = last = int(value)
+    if first < 1 or last < first:
+        raise ValueError(f"无效的行号范围: {value}")
+    return first, last
+
+class Rule:
+    """一条内容转换规则：文件名匹配 + 行号/正则匹配 + 替换"""
+
+    def __init__(self, name, files='*', line='', pattern='', replace='',
+                 when='', unless='', count='0'):
+        if not pattern:
+            raise ValueError(f"规则 {name} 缺少 pattern")
+        self.name = name
+        self.globs = [g for g in re.split(r'[;\s]+', files.lower()) if g]
+        self.lines = parse_lines(line)
+        self.pattern = re.compile(pattern)
+        self.replace = replace
+        self.when = re.compile(when) if when else None
+        self.unless = re.compile(unless) if unless else None
+        self.count = int(count)
+
+    def apply(self, text):
+        """对一行内容应用规则，未修改时返回None"""
+        if self.when and not self.when.search(text):
+            return None
+        if self.unless and self.unless.search(text):
+            return None
+        new_text, n = self.pattern.subn(self.replace, text, count=self.count)
+        if n == 0 or new_text == text:
+            return None
+        return new_text
+
+class RulePlan:
+    """某一类文件适用的规则，按行号预先建立分派表"""
+
+    def __init__(self, rules):
+        self.every_line = [r for r in rules if r.lines is None]  # 作用于所有行的规则
+        self.by_line = {}  # 行号 -> 规则列表
+        for rule in rules:
+            if rule.lines is None:
+                continue
+            first, last = rule.lines
+            for number in range(first, last + 1):
+                self.by_line.setdefault(number, []).append(rule)
+        # 作用于所有行的规则合并到每个指定行号的列表中，逐行只需一次查表
+        if self.every_line:
+            for number in self.by_line:
+                self.by_line[number] = [r for r in rules if r.lines is None or r in self.by_line[number]]
+        self.head_lines = max(self.by_line) if self.by_line else 0
+
+    def apply_line(self, number, raw, changes=None):
+        """对第number行（含换行符的bytes）应用规则，未修改时返回None
+
+        changes不为None时把 (行号, 原内容, 新内容) 加入其中，由调用方
+        在文件处理完后统一记录日志。
+        """
+        rules = self.by_line.get(number, self.every_line)
+        if not rules:
+            return None
+
+        body = raw.rstrip(b'\r\n')
+        old_text = text = body.decode('utf-8')
+        changed = False
+        for rule in rules:
+            new_text = rule.apply(text)
+            if new_text is not None:
+                text = new_text
+                changed = True
+        if not changed:
+            return None
+
+        if changes is not None:
+            changes.append((number, old_text.strip(), text.strip()))
+        else:
+            logging.info("修改第%d行: [%s] -> [%s]", number, old_text.strip(), text.strip())
+        # 只替换内容，保留原来的换行符
+        return text.encode('utf-8') + raw[len(body):]
+
+    def apply_head(self, head, changes=None):
+        """对已读取的头部行应用规则（原地修改），返回是否修改"""
+        modified = False
+        for index, raw in enumerate(head):
+            new_raw = self.apply_line(index + 1, raw, changes)
+            if new_raw is not None:
+                head[index] = new_raw
+                modified = True
+        return modified
+
+    def apply_rest(self, src, dst, first_line, changes=None):
+        """逐行转换头部之后的内容并写入dst，返回是否修改"""
+        modified = False
+        for number, raw in enumerate(src, first_line):
+            new_raw = self.apply_line(number, raw, changes)
+            if new_raw is not None:
+                raw = new_raw
+                modified = True
+            dst.write(raw)
+        return modified
+
+class CompiledRules:
+    """编译后的规则集，重新加载时整体替换"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        # 文件名通配符 -> 使用该通配符的规则序号，相同通配符只匹配一次
+        patterns = {}
+        for index, rule in enumerate(rules):
+            for glob in rule.globs:
+                patterns.setdefault(glob, []).append(index)
+        self.globs = [(re.compile(fnmatch.translate(glob)), indexes)
+                      for glob, indexes in patterns.items()]
+        self.plans = {}  # 适用规则序号 -> RulePlan
+
+    def plan_for(self, filename):
+        name = filename.lower()
+        matched = set()
+        for regex, indexes in self.globs:
+            if regex.match(name):
+                matched.update(indexes)
+        if not matched:
+            return None
+
+        key = tuple(sorted(matched))
+        plan = self.plans.get(key)
+        if plan is None:
+            plan = RulePlan([self.rules[i] for i in key])
+            self.plans[key] = plan
+        return plan
+
+class RuleEngine:
+    """从配置文件加载内容转换规则，配置文件修改后自动重新加载
+
+    规则写在 [Rule:名称] 段中，例如：
+
+        [Rule:line7]
+        files = *.utf8
+        line = 7
+        pattern = 6
+        replace = 6.
+        unless = 6\\.
+    """
+
+    def __init__(self, config_file=None, reload_interval=1.0):
+        self.config_file = config_file
+        self.reload_interval = reload_interval
+        self.compiled = CompiledRules([])
+        self.mtime = None
+        self.last_check = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """加载并编译规则，失败时保留原有规则"""
+        try:
+            sections = DEFAULT_RULES
+            mtime = None
+            if self.config_file and os.path.exists(self.config_file):
+                mtime = os.path.getmtime(self.config_file)
+                config = configparser.ConfigParser(interpolation=None)
+                config.read(self.config_file, encoding='utf-8')
+                configured = {
+                    name.split(':', 1)[1]: dict(config[name])
+                    for name in config.sections() if name.startswith('Rule:')
+                }
+                if configured:
+                    sections = configured
+
+            rules = [Rule(name, **options) for name, options in sections.items()]
+            self.compiled = CompiledRules(rules)
+            self.mtime = mtime
+            logging.info(f"已加载 {len(rules)} 条处理规则")
+            return True
+        except Exception as e:
+            logging.error(f"加载处理规则失败: {str(e)}")
+            return False
+
+    def maybe_reload(self):
+        """配置文件有修改时重新加载（每隔reload_interval秒最多检查一次）"""
+        if not self.config_file:
+            return
+        now = time.monotonic()
+        if now - self.last_check < self.reload_interval:
+            return
+        with self.lock:
+            if now - self.last_check < self.reload_interval:
+                return
+            self.last_check = now
+            try:
+                mtime = os.path.getmtime(self.config_file)
+            except OSError:
+                return
+            if mtime != self.mtime:
+                logging.info("检测到配置文件修改，重新加载处理规则")
+                # 加载失败时也记录修改时间，避免每次都重复报错
+                self.mtime = mtime
+                self.load()
+
+    def plan_for(self, filename):
+        """返回适用于该文件名的规则，没有适用规则时返回None"""
+        return self.compiled.plan_for(filename)
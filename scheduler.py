@@ -0,0 +1,101 @@
+import heapq
+import logging
+import threading
+import time
+
+class CoalescingScheduler:
+    """按路径合并事件的定时调度器
+
+    同一个键在到期前再次调度时只保留最新的一次，连续的事件因此被合并成
+    一次执行。所有等待中的任务放在一个按到期时间排序的堆中，由一个线程
+    负责执行，等待中的任务不占用线程。
+    """
+
+    def __init__(self, settle=0.1, name='Scheduler'):
+        self.settle = settle  # 默认的静默时间（秒）
+        self.name = name
+        self.heap = []  # (到期时间, 序号, 键)
+        self.entries = {}  # 键 -> (到期时间, 序号, 动作)
+        self.sequence = 0
+        self.cond = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.coalesced = 0  # 被合并的事件数
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def schedule(self, key, action, delay=None):
+        """delay秒后执行action（默认使用settle），同一键的旧任务被替换"""
+        due = time.monotonic() + (self.settle if delay is None else delay)
+        with self.cond:
+            if key in self.entries:
+                self.coalesced += 1
+            self.sequence += 1
+            self.entries[key] = (due, self.sequence, action)
+            heapq.heappush(self.heap, (due, self.sequence, key))
+            if self.heap[0][1] == self.sequence:
+                # 新任务最早到期，唤醒调度线程重新计算等待时间
+                self.cond.notify()
+
+    def cancel(self, key):
+        """取消等待中的任务"""
+        with self.cond:
+            self.entries.pop(key, None)
+
+    def pending(self, key):
+        """该键是否有等待中的任务"""
+        with self.cond:
+            return key in self.entries
+
+    def keys(self):
+        """等待中的任务的键"""
+        with self.cond:
+            return list(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _next_action(self):
+        """等待并取出下一个到期的任务，停止时返回None"""
+        with self.cond:
+            while self.running:
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+                due, sequence, key = self.heap[0]
+                entry = self.entries.get(key)
+                if entry is None or entry[1] != sequence:
+                    # 已被替换或取消的旧任务
+                    heapq.heappop(self.heap)
+                    continue
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self.cond.wait(wait)
+                    continue
+                heapq.heappop(self.heap)
+                del self.entries[key]
+                return entry[2]
+            return None
+
+    def _run(self):
+        while True:
+            action = self._next_action()
+            if action is None:
+                return
+            try:
+                action()
+            except Exception as e:
+                logging.error(f"执行定时任务时出错: {str(e)}", exc_info=True)
@@ -1,18 +1,115 @@
-import socket
 import sys
+import json
+import socket
+import asyncio
+import logging
+import threading
+
+CONTROL_PORT = 12721
+
+def send_command(command, port=CONTROL_PORT, timeout=5.0):
+    """向正在运行的实例发送命令，返回应答（字典）
+
+    协议按行传输：每行一个请求，可以是命令名（如 stats），也可以是
+    {"command": "stats"} 这样的JSON；每个请求返回一行JSON应答
+    {"ok": true, "result": ...} 或 {"ok": false, "error": "..."}。
+    """
+    with socket.create_connection(('localhost', port), timeout=timeout) as sock:
+        sock.sendall(json.dumps({'command': command}).encode('utf-8') + b'\n')
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data.decode('utf-8'))
 
 class SingleInstance:
-    def __init__(self, port=12721):
+    """保证只有一个实例运行，并把占用的端口作为本机控制通道
+
+    端口已被占用时请求正在运行的实例显示窗口，然后退出。
+    """
+
+    def __init__(self, port=CONTROL_PORT):
         self.port = port
+        self.commands = {}  # 命令名 -> 函数（在线程池中调用，返回值需可序列化为JSON）
+        self.loop = None
+        self.thread = None
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
             self.sock.bind(('localhost', self.port))
-            self.sock.listen(1)
+            self.sock.listen(5)
         except socket.error:
-            sys.exit(0)  # 如果端口被占用，说明已经有实例在运行，直接退出
+            # 如果端口被占用，说明已经有实例在运行：让它显示窗口后直接退出
+            try:
+                send_command('show', self.port, timeout=2.0)
+            except Exception:
+                pass
+            sys.exit(0)
+
+    def serve(self, commands):
+        """在后台线程中处理控制命令"""
+        self.commands = dict(commands)
+        if self.thread:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name='Control', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.loop and self.thread:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(2.0)
+            self.thread = None
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.sock.setblocking(False)
+            self.loop.run_until_complete(asyncio.start_server(self._handle_client, sock=self.sock))
+            logging.info(f"控制通道: localhost:{self.port}")
+            self.loop.run_forever()
+        except Exception as e:
+            logging.error(f"控制通道出错: {str(e)}", exc_info=True)
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self._execute(line)
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except Exception as e:
+            logging.debug("控制连接断开: %s", e)
+        finally:
+            writer.close()
+
+    async def _execute(self, line):
+        """解析一行请求并执行，耗时的命令（如处理完剩余文件后退出）不阻塞其他连接"""
+        try:
+            text = line.decode('utf-8').strip()
+            name = json.loads(text)['command'] if text.startswith('{') else text
+        except (ValueError, KeyError, TypeError):
+            return {'ok': False, 'error': "无效的请求"}
+
+        func = self.commands.get(name)
+        if func is None:
+            return {'ok': False, 'error': f"未知命令: {name}", 'commands': sorted(self.commands)}
+
+        logging.debug("收到控制命令: %s", name)
+        try:
+            result = await self.loop.run_in_executor(None, func)
+        except Exception as e:
+            logging.error(f"执行控制命令失败: {name}: {str(e)}", exc_info=True)
+            return {'ok': False, 'error': str(e)}
+        return {'ok': True, 'result': result}
 
     def __del__(self):
         try:
             self.sock.close()
         except:
-            pass 
\ No newline at end of file
+            pass
@@ -0,0 +1,72 @@
+import os
+import time
+import shutil
+import pytest
+import archive
+from archive import Archiver, extract
+
+def wait_archived(archiver, count, timeout=10):
+    deadline = time.monotonic() + timeout
+    while archiver.archived < count and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert archiver.archived == count
+
+def test_copy_does_not_share_the_file(tmp_path):
+    source = tmp_path / 'a.utf8'
+    source.write_bytes(b'original\n')
+    archiver = Archiver(str(tmp_path / 'arc'), batch_interval=0.1)
+    archiver.add(str(source), 'Paths', 'a.utf8', link=False)
+    # 源文件被重命名为目标文件后，使用方原地修改目标文件
+    target = tmp_path / 'target.utf8'
+    os.replace(str(source), str(target))
+    target.write_bytes(b'changed by consumer\n')
+
+    archiver.start()
+    try:
+        wait_archived(archiver, 1)
+    finally:
+        archiver.stop()
+    output = extract(str(tmp_path / 'arc'), 'a.utf8', str(tmp_path / 'out'))
+    with open(output, 'rb') as f:
+        assert f.read() == b'original\n'
+
+def test_copy_is_not_visible_until_complete(tmp_path, monkeypatch):
+    source = tmp_path / 'a.utf8'
+    source.write_bytes(b'original\n')
+    archiver = Archiver(str(tmp_path / 'arc'), batch_interval=0.1)
+    seen = []
+    original_copy2 = shutil.copy2
+
+    def copy2(src, dst):
+        original_copy2(src, dst)
+        # 复制过程中归档线程扫描暂存文件夹
+        seen.append(archiver._scan_spool())
+
+    monkeypatch.setattr(archive.shutil, 'copy2', copy2)
+    archiver.add(str(source), 'Paths', 'a.utf8', link=False)
+    assert seen == [[]]
+    spooled = archiver._scan_spool()
+    assert len(spooled) == 1
+    with open(spooled[0], 'rb') as f:
+        assert f.read() == b'original\n'
+
+def test_extract_by_relative_path(tmp_path):
+    archiver = Archiver(str(tmp_path / 'arc'), batch_interval=0.1)
+    for folder in ('sub1', 'sub2'):
+        source = tmp_path / f'{folder}-result.utf8'
+        source.write_text(folder)
+        archiver.add(str(source), 'Paths', os.path.join(folder, 'result.utf8'))
+    archiver.start()
+    try:
+        wait_archived(archiver, 2)
+    finally:
+        archiver.stop()
+
+    arc, out = str(tmp_path / 'arc'), str(tmp_path / 'out')
+    with pytest.raises(ValueError):
+        extract(arc, 'result.utf8', out)
+    for folder in ('sub1', 'sub2'):
+        with open(extract(arc, f'{folder}/result.utf8', out)) as f:
+            assert f.read() == folder
+    with open(extract(arc, 'Paths\\sub1\\result.utf8', out)) as f:
+        assert f.read() == 'sub1'
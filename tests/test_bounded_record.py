@@ -0,0 +1,37 @@
+import time
+from bounded_record import BoundedRecord
+
+def test_evicts_least_recently_updated():
+    record = BoundedRecord(max_size=2, ttl=0)
+    record.add('a')
+    record.add('b')
+    record.add('a')  # 更新后a变为最新
+    record.add('c')
+    assert 'a' in record and 'c' in record
+    assert 'b' not in record
+    assert len(record) == 2
+    assert record.evictions == 1
+
+def test_stores_values():
+    record = BoundedRecord(max_size=10, ttl=0)
+    record['a'] = 1
+    assert record.get('a') == 1
+    assert record.get('missing', 'default') == 'default'
+    record.discard('a')
+    assert 'a' not in record
+
+def test_entries_expire_after_ttl():
+    record = BoundedRecord(max_size=10, ttl=0.05)
+    record.add('old')
+    time.sleep(0.1)
+    record.add('new')
+    assert 'old' not in record
+    assert 'new' in record
+    assert record.expirations == 1
+
+def test_zero_ttl_never_expires(monkeypatch):
+    record = BoundedRecord(max_size=10, ttl=0)
+    record.add('a')
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 10 ** 6)
+    assert 'a' in record
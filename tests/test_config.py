@@ -0,0 +1,49 @@
+import configparser
+from engine import TibasepathEngine
+
+def read(path):
+    config = configparser.ConfigParser()
+    config.read(str(path), encoding='utf-8')
+    return config
+
+def test_save_config_keeps_other_path_settings(tmp_path):
+    config_file = tmp_path / 'tibasepath.conf'
+    config_file.write_text(
+        '[Paths]\n'
+        f'source = {tmp_path}\n'
+        f'target = {tmp_path}\n'
+        'copies = \\\\lims-server\\import\n'
+        'optional_copies = E:\\Archive\n'
+        'recursive = true\n'
+        'extensions = .utf8 .csv\n'
+        '[Processing]\n'
+        'workers = 2\n',
+        encoding='utf-8'
+    )
+    engine = TibasepathEngine(str(config_file))
+    assert engine.load_config()
+
+    new_source, new_target = tmp_path / 'in', tmp_path / 'out'
+    engine.save_config(str(new_source), str(new_target))
+
+    paths = read(config_file)['Paths']
+    assert paths['source'] == str(new_source)
+    assert paths['target'] == str(new_target)
+    assert paths['copies'] == '\\\\lims-server\\import'
+    assert paths['optional_copies'] == 'E:\\Archive'
+    assert paths['recursive'] == 'true'
+    assert paths['extensions'] == '.utf8 .csv'
+    assert read(config_file)['Processing']['workers'] == '2'
+
+def test_invalid_paths_keep_other_settings(tmp_path):
+    config_file = tmp_path / 'tibasepath.conf'
+    config_file.write_text(
+        '[Paths]\nsource = /does/not/exist\ntarget = /does/not/exist\nrecursive = true\n',
+        encoding='utf-8'
+    )
+    engine = TibasepathEngine(str(config_file))
+    assert not engine.load_config()
+    assert engine.config['Paths']['source'] == ''
+
+    engine.save_config(str(tmp_path), str(tmp_path))
+    assert read(config_file)['Paths']['recursive'] == 'true'
@@ -0,0 +1,47 @@
+import os
+from content_index import ContentIndex, new_hasher, DIGEST_SIZE
+
+def digest_of(data):
+    hasher = new_hasher()
+    hasher.update(data)
+    return hasher.digest()[:DIGEST_SIZE]
+
+def indexed_target(tmp_path, data=b'content\n'):
+    index = ContentIndex(str(tmp_path / 'index.db'))
+    target = tmp_path / 'a.utf8'
+    target.write_bytes(data)
+    index.update(str(target), digest_of(data), len(data))
+    return index, target
+
+def rows(index):
+    return index._connect().execute('SELECT COUNT(*) FROM contents').fetchone()[0]
+
+def test_matches_unchanged_target(tmp_path):
+    index, target = indexed_target(tmp_path)
+    assert index.matches(str(target), digest_of(b'content\n'), 8)
+    assert not index.matches(str(target), digest_of(b'other!!\n'), 8)
+    index.close()
+
+def test_mtime_change_invalidates(tmp_path):
+    index, target = indexed_target(tmp_path)
+    # 使用方原地改写后大小不变，修改时间不同
+    st = os.stat(str(target))
+    os.utime(str(target), ns=(st.st_atime_ns, st.st_mtime_ns + 1000000))
+    assert not index.matches(str(target), digest_of(b'content\n'), 8)
+    index.close()
+
+def test_size_change_invalidates(tmp_path):
+    index, target = indexed_target(tmp_path)
+    st = os.stat(str(target))
+    target.write_bytes(b'content plus more\n')
+    os.utime(str(target), ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert not index.matches(str(target), digest_of(b'content\n'), 8)
+    index.close()
+
+def test_missing_target_removes_row(tmp_path):
+    index, target = indexed_target(tmp_path)
+    assert rows(index) == 1
+    target.unlink()
+    assert not index.matches(str(target), digest_of(b'content\n'), 8)
+    assert rows(index) == 0
+    index.close()
@@ -0,0 +1,106 @@
+import os
+import time
+import threading
+import durability
+from durability import CommitManager, STRICT, GROUP, RELAXED
+
+def stage(tmp_path, name, data=b'data'):
+    """写好一个临时文件，返回 (临时文件, 目标文件)"""
+    target = str(tmp_path / name)
+    with open(target + '.tmp', 'wb') as f:
+        f.write(data)
+    return target + '.tmp', target
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_group_commits_when_batch_is_full(tmp_path):
+    manager = CommitManager(GROUP, group_size=3, group_interval=10)
+    done = []
+    manager.start()
+    try:
+        for name in ('a', 'b'):
+            manager.commit(*stage(tmp_path, name), done.append)
+        time.sleep(0.2)
+        # 不满一批且未到group_interval，不提交
+        assert done == []
+        assert manager.pending() == 2
+        manager.commit(*stage(tmp_path, 'c'), done.append)
+        assert wait_for(lambda: len(done) == 3)
+    finally:
+        manager.stop()
+    assert done == [None, None, None]
+    assert manager.batches == 1
+    assert sorted(os.listdir(str(tmp_path))) == ['a', 'b', 'c']
+
+def test_group_commits_after_interval(tmp_path):
+    manager = CommitManager(GROUP, group_size=100, group_interval=0.2)
+    done = []
+    manager.start()
+    try:
+        started = time.monotonic()
+        for name in ('a', 'b'):
+            manager.commit(*stage(tmp_path, name), done.append)
+        assert wait_for(lambda: len(done) == 2)
+        assert time.monotonic() - started >= 0.2
+    finally:
+        manager.stop()
+    assert manager.batches == 1
+
+def test_group_callback_after_fsync_and_rename(tmp_path, monkeypatch):
+    events = []
+    fsync, replace = os.fsync, os.replace
+
+    def recording_fsync(fd):
+        events.append('fsync')
+        fsync(fd)
+
+    def recording_replace(src, dst):
+        events.append('rename')
+        replace(src, dst)
+
+    monkeypatch.setattr(durability.os, 'fsync', recording_fsync)
+    monkeypatch.setattr(durability.os, 'replace', recording_replace)
+    manager = CommitManager(GROUP, group_size=2, group_interval=10)
+    files = [stage(tmp_path, name) for name in ('a', 'b')]
+
+    def callback(error):
+        # 回调中删除源文件：此时整批都已写入磁盘并就位
+        assert error is None
+        assert all(os.path.exists(target) and not os.path.exists(temp) for temp, target in files)
+        events.append('callback')
+
+    manager.start()
+    try:
+        for temp, target in files:
+            manager.commit(temp, target, callback)
+        assert wait_for(lambda: events.count('callback') == 2)
+    finally:
+        manager.stop()
+    first_callback = events.index('callback')
+    assert events[:first_callback].count('fsync') >= 2
+    assert events[:first_callback].count('rename') == 2
+    assert 'fsync' not in events[first_callback:] and 'rename' not in events[first_callback:]
+
+def test_strict_and_relaxed_commit_inline(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(durability.os, 'fsync', lambda fd: (synced.append(fd), fsync(fd)))
+    for mode in (STRICT, RELAXED):
+        manager = CommitManager(mode)
+        manager.start()
+        assert manager.thread is None
+        temp, target = stage(tmp_path, mode)
+        with open(temp, 'rb+') as f:
+            assert manager.sync(f) == (mode == STRICT)
+        threads = []
+        manager.commit(temp, target, lambda error: threads.append((error, threading.current_thread())))
+        # 返回前已在调用线程中提交
+        assert threads == [(None, threading.current_thread())]
+        assert os.path.exists(target) and not os.path.exists(temp)
+        manager.stop()
+    # 只有strict模式fsync
+    assert len(synced) == 1
@@ -0,0 +1,182 @@
+import os
+import pytest
+import engine
+from engine import FileHandler
+from worker_pool import WorkerPool
+from content_index import ContentIndex
+
+class ManualScheduler:
+    """只记录安排的操作，由测试决定何时执行"""
+
+    def __init__(self):
+        self.actions = {}
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def schedule(self, key, action, delay=None):
+        self.actions[key] = action
+
+    def cancel(self, key):
+        self.actions.pop(key, None)
+
+    def pending(self, key):
+        return key in self.actions
+
+def make_handler(tmp_path, **kwargs):
+    source = tmp_path / 'src'
+    target = tmp_path / 'dst'
+    source.mkdir(exist_ok=True)
+    target.mkdir(exist_ok=True)
+    kwargs.setdefault('scheduler', ManualScheduler())
+    return FileHandler(str(source), str(target), workers=1, **kwargs)
+
+@pytest.fixture
+def paused_pool():
+    pool = WorkerPool(lambda path: None, workers=1)
+    pool.pause()
+    yield pool
+    pool.resume()
+    pool.stop()
+
+def test_remove_retry_runs_in_pool(tmp_path, monkeypatch, paused_pool):
+    scheduler = ManualScheduler()
+    handler = make_handler(tmp_path, scheduler=scheduler, pool=paused_pool)
+    path = tmp_path / 'src' / 'a.utf8'
+    path.write_text('data')
+
+    def locked(file_path):
+        raise PermissionError('locked')
+
+    monkeypatch.setattr(engine.os, 'remove', locked)
+    handler.remove_source(str(path))
+    action = scheduler.actions[('retry', ('remove', str(path)))]
+    monkeypatch.undo()
+
+    # 调度器线程只把重试放入处理池，不在调度器线程中删除
+    assert action()
+    assert str(path) in paused_pool.pending
+    assert path.exists()
+    handler.stop()
+
+def test_reload_stops_dropped_handlers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for folder in ('a', 'b', 'out'):
+        (tmp_path / folder).mkdir()
+    config_file = tmp_path / 'tibasepath.conf'
+    config_file.write_text(
+        f"[Paths]\nsource = {tmp_path / 'a'}\ntarget = {tmp_path / 'out'}\n\n"
+        f"[Watch:B]\nsource = {tmp_path / 'b'}\ntarget = {tmp_path / 'out'}\n",
+        encoding='utf-8'
+    )
+    instance = engine.TibasepathEngine(str(config_file))
+    instance.load_config()
+    stopped = []
+    try:
+        assert instance.start_monitoring()
+        kept, dropped = instance.handlers
+        monkeypatch.setattr(dropped, 'stop', lambda: stopped.append(dropped))
+        # 重新加载时删除了监控B
+        instance.config.remove_section('Watch:B')
+        assert instance.start_monitoring()
+        assert instance.handlers == [kept]
+        assert stopped == [dropped]
+    finally:
+        instance.stop()
+
+def test_scheduled_file_is_in_flight(tmp_path, paused_pool):
+    handler = make_handler(tmp_path, pool=paused_pool)
+    path = str(tmp_path / 'src' / 'a.utf8')
+    with open(path, 'w') as f:
+        f.write('data')
+    assert not handler.in_flight(path)
+    handler.schedule_event(path, False)
+    assert handler.in_flight(path)
+    handler.stop()
+
+def write_source(tmp_path, data, name='a.utf8'):
+    path = tmp_path / 'src' / name
+    path.write_bytes(data)
+    return str(path)
+
+def test_line7_rewrite_keeps_line_endings(tmp_path, paused_pool):
+    handler = make_handler(tmp_path, pool=paused_pool)
+    head = b'h1\r\nh2\nh3\r\nh4\r\nh5\nh6\r\n'
+    data = head + b'value 6\r\n' + b'x\n' * 3 + b'y\r\nlast'
+    path = write_source(tmp_path, data)
+    assert handler.process_file(path)
+    with open(str(tmp_path / 'dst' / 'a.utf8'), 'rb') as f:
+        assert f.read() == head + b'value 6.\r\n' + b'x\n' * 3 + b'y\r\nlast'
+    assert not os.path.exists(path)
+    assert handler.stats['modified'] == 1
+    assert handler.stats['renamed'] == 0
+    handler.stop()
+
+def test_unmodified_file_renamed_on_same_device(tmp_path, paused_pool):
+    handler = make_handler(tmp_path, pool=paused_pool)
+    data = b'line\r\n' * 6 + b'value 6.\r\n' + b'rest\n'
+    path = write_source(tmp_path, data)
+    inode = os.stat(path).st_ino
+    assert handler.process_file(path)
+    target = str(tmp_path / 'dst' / 'a.utf8')
+    # 直接重命名，目标就是原来的文件
+    assert os.stat(target).st_ino == inode
+    with open(target, 'rb') as f:
+        assert f.read() == data
+    assert handler.stats['renamed'] == 1
+    assert handler.stats['modified'] == 0
+    handler.stop()
+
+def test_unmodified_file_copied_across_devices(tmp_path, monkeypatch, paused_pool):
+    handler = make_handler(tmp_path, pool=paused_pool)
+    monkeypatch.setattr(handler, 'same_device', lambda file_path: False)
+    data = b'line\n' * 6 + b'value 6.\n' + b'rest\n' * 100
+    path = write_source(tmp_path, data)
+    inode = os.stat(path).st_ino
+    assert handler.process_file(path)
+    target = str(tmp_path / 'dst' / 'a.utf8')
+    # 复制到临时文件后提交，再删除源文件
+    assert os.stat(target).st_ino != inode
+    with open(target, 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(path)
+    assert not os.path.exists(target + '.tmp')
+    assert handler.stats['renamed'] == 0
+    assert handler.stats['moved'] == 1
+    handler.stop()
+
+def test_file_shorter_than_seven_lines(tmp_path, paused_pool):
+    handler = make_handler(tmp_path, pool=paused_pool)
+    data = b'h1\r\nh2 6\r\nh3'
+    path = write_source(tmp_path, data)
+    assert handler.process_file(path)
+    with open(str(tmp_path / 'dst' / 'a.utf8'), 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(path)
+    assert handler.stats['modified'] == 0
+    assert handler.stats['moved'] == 1
+    handler.stop()
+
+def test_identical_reexport_not_rewritten(tmp_path, paused_pool):
+    index = ContentIndex(str(tmp_path / 'index.db'))
+    handler = make_handler(tmp_path, pool=paused_pool, index=index)
+    data = b'line\n' * 6 + b'value 6\n' + b'rest\n'
+    assert handler.process_file(write_source(tmp_path, data))
+    target = str(tmp_path / 'dst' / 'a.utf8')
+    first = os.stat(target)
+    assert handler.stats['identical'] == 0
+
+    # 同一结果再次导出
+    path = write_source(tmp_path, data)
+    assert handler.process_file(path)
+    assert not os.path.exists(path)
+    assert os.stat(target).st_ino == first.st_ino
+    assert os.stat(target).st_mtime_ns == first.st_mtime_ns
+    assert handler.stats['identical'] == 1
+    assert handler.stats['bytes_saved'] == len(data) + 1
+    assert handler.stats['moved'] == 2
+    handler.stop()
+    index.close()
@@ -0,0 +1,107 @@
+import os
+import hashlib
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from fanout import Destination, Output, TeeWriter, FanOut, parse_paths, open_temp
+
+class Committer:
+    def sync(self, f):
+        f.flush()
+        return True
+
+def make_outputs(tmp_path, *specs):
+    """specs: (文件夹名, 是否必需)"""
+    return [Output(Destination(str(tmp_path / name), required), 'a.utf8') for name, required in specs]
+
+def failing_opener(bad):
+    def opener(temp_file):
+        if os.path.dirname(temp_file) == bad:
+            raise PermissionError(temp_file)
+        return open_temp(temp_file)
+    return opener
+
+def test_writes_same_content_to_every_output(tmp_path):
+    outputs = make_outputs(tmp_path, ('t1', True), ('t2', True), ('t3', False))
+    hasher = hashlib.sha256()
+    data = [b'line %d\r\n' % i for i in range(1000)]
+    with ThreadPoolExecutor(2) as executor:
+        tee = TeeWriter(outputs, executor, chunk_size=256, hasher=hasher)
+        try:
+            tee.open()
+            tee.writelines(data)
+            assert tee.sync(Committer())
+        finally:
+            tee.close()
+    content = b''.join(data)
+    for output in outputs:
+        with open(output.temp, 'rb') as f:
+            assert f.read() == content
+    assert tee.size == len(content)
+    assert hasher.digest() == hashlib.sha256(content).digest()
+
+def test_optional_output_failure_is_dropped(tmp_path):
+    outputs = make_outputs(tmp_path, ('t1', True), ('bad', False))
+    tee = TeeWriter(outputs, opener=failing_opener(str(tmp_path / 'bad')))
+    try:
+        tee.open()
+        tee.write(b'data\n')
+        assert tee.sync(Committer())
+    finally:
+        tee.close()
+    assert tee.live() == [outputs[0]]
+    assert isinstance(outputs[1].error, PermissionError)
+    with open(outputs[0].temp, 'rb') as f:
+        assert f.read() == b'data\n'
+
+def test_required_output_failure_raises(tmp_path):
+    outputs = make_outputs(tmp_path, ('t1', True), ('bad', True))
+    tee = TeeWriter(outputs, opener=failing_opener(str(tmp_path / 'bad')))
+    try:
+        with pytest.raises(PermissionError):
+            tee.open()
+    finally:
+        tee.close()
+
+def test_skip_removes_temp(tmp_path):
+    outputs = make_outputs(tmp_path, ('t1', True), ('t2', True))
+    tee = TeeWriter(outputs)
+    try:
+        tee.open()
+        tee.write(b'x')
+        tee.flush_chunk()
+        tee.skip(outputs[1])
+        assert tee.sync(Committer())
+    finally:
+        tee.close()
+    assert tee.live() == [outputs[0]]
+    assert not os.path.exists(outputs[1].temp)
+
+def test_fanout_waits_for_required_only(tmp_path):
+    outputs = make_outputs(tmp_path, ('t1', True), ('t2', True), ('t3', False))
+    done, optional = [], []
+    fanout = FanOut(outputs, done.append, lambda target, error: optional.append((target, error)))
+
+    error = OSError('offline')
+    fanout.committed(outputs[2], error)
+    assert optional == [(outputs[2].target, error)]
+    assert not done
+    fanout.committed(outputs[0], None)
+    assert not done
+    fanout.committed(outputs[1], None)
+    assert done == [[]]
+
+def test_fanout_reports_required_error(tmp_path):
+    outputs = make_outputs(tmp_path, ('t1', True), ('t2', True))
+    done = []
+    fanout = FanOut(outputs, done.append, lambda target, error: None)
+    error = OSError('disk full')
+    fanout.committed(outputs[0], error)
+    fanout.committed(outputs[1], None)
+    assert done == [[error]]
+    assert outputs[0].error is error
+
+def test_parse_paths():
+    assert parse_paths('\\\\server\\import; E:\\My Archive\n\nF:\\x') == [
+        '\\\\server\\import', 'E:\\My Archive', 'F:\\x'
+    ]
+    assert parse_paths('') == []
@@ -0,0 +1,51 @@
+import os
+from journal import ProcessingJournal
+from engine import TibasepathEngine
+
+def test_record_updates_state_and_keeps_paths(tmp_path):
+    journal = ProcessingJournal(str(tmp_path / 'journal.db'))
+    try:
+        journal.record('a.utf8', ProcessingJournal.SEEN, 'target/a.utf8', 'target/a.utf8.tmp')
+        journal.record('a.utf8', ProcessingJournal.STAGED)
+        assert journal.pending() == [
+            ('a.utf8', 'target/a.utf8', 'target/a.utf8.tmp', ProcessingJournal.STAGED)
+        ]
+        journal.record('b.utf8', ProcessingJournal.SEEN)
+        journal.finish('a.utf8')
+        assert [row[0] for row in journal.pending()] == ['b.utf8']
+    finally:
+        journal.close()
+
+def test_recover_uses_the_watch_of_each_source(tmp_path):
+    folders = {name: tmp_path / name for name in ('s1', 't1', 's2', 't2')}
+    for folder in folders.values():
+        folder.mkdir()
+    config_file = tmp_path / 'tibasepath.conf'
+    config_file.write_text(
+        f"[Paths]\nsource = {folders['s1']}\ntarget = {folders['t1']}\n"
+        f"[Watch:lab2]\nsource = {folders['s2']}\ntarget = {folders['t2']}\n"
+        f"[Processing]\nrescan_interval = 0\njournal = {tmp_path / 'journal.db'}\n"
+        f"archive = {tmp_path / 'arc'}\n",
+        encoding='utf-8'
+    )
+    # 上次退出时lab2的文件已提交、源文件尚未删除
+    source = folders['s2'] / 'a.utf8'
+    source.write_text('a')
+    (folders['t2'] / 'a.utf8').write_text('a')
+    journal = ProcessingJournal(str(tmp_path / 'journal.db'))
+    journal.record(str(source), ProcessingJournal.COMMITTED, str(folders['t2'] / 'a.utf8'), '')
+    journal.close()
+
+    engine = TibasepathEngine(str(config_file))
+    assert engine.load_config()
+    try:
+        assert engine.start_monitoring()
+        assert not source.exists()
+        spool = str(tmp_path / 'arc' / 'spool')
+        spooled = [os.path.relpath(os.path.join(root, name), spool)
+                   for root, _, names in os.walk(spool) for name in names]
+    finally:
+        engine.stop()
+    # 归档在lab2监控名下，相对路径按lab2的源文件夹计算
+    assert len(spooled) == 1
+    assert spooled[0].startswith(os.path.join('lab2', 'a.utf8.'))
@@ -0,0 +1,79 @@
+import os
+import time
+import threading
+from readiness import ReadinessDetector, READY, WAITING, GONE
+
+def test_old_mtime_still_waits_for_quiet_period(tmp_path):
+    path = tmp_path / 'a.utf8'
+    path.write_text('partial')
+    # 保留了原修改时间的复制，或时钟较慢的文件服务器
+    past = time.time() - 3600
+    os.utime(str(path), (past, past))
+
+    detector = ReadinessDetector(quiet_period=0.2, timeout=5)
+    started = time.monotonic()
+    assert detector.wait_until_ready(str(path))
+    assert time.monotonic() - started >= 0.2
+
+def test_growing_file_waits_until_stable(tmp_path):
+    path = tmp_path / 'a.utf8'
+    path.write_text('')
+    stop = time.monotonic() + 0.5
+
+    def writer():
+        with open(str(path), 'a') as f:
+            while time.monotonic() < stop:
+                f.write('line\n')
+                f.flush()
+                time.sleep(0.02)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        assert ReadinessDetector(quiet_period=0.2, timeout=5).wait_until_ready(str(path))
+        assert time.monotonic() >= stop
+    finally:
+        thread.join()
+
+def test_missing_file(tmp_path):
+    assert not ReadinessDetector(timeout=1).wait_until_ready(str(tmp_path / 'none.utf8'))
+
+def test_check_does_not_block(tmp_path):
+    path = tmp_path / 'a.utf8'
+    path.write_text('data')
+    detector = ReadinessDetector(quiet_period=10, timeout=60)
+    started = time.monotonic()
+    state, wait = detector.check(str(path))
+    assert state == WAITING
+    assert 9 < wait <= 10
+    assert time.monotonic() - started < 1
+
+def test_observed_quiet_time_is_counted(tmp_path):
+    path = tmp_path / 'a.utf8'
+    path.write_text('data')
+    detector = ReadinessDetector(quiet_period=0.2, timeout=5)
+    # 事件到达时记录，之后的检查计入已经过去的静默时间
+    detector.observe(str(path))
+    time.sleep(0.25)
+    assert detector.check(str(path)) == (READY, 0)
+    # 处理前再次检查，文件没有变化仍然就绪
+    assert detector.check(str(path))[0] == READY
+
+def test_change_restarts_quiet_period(tmp_path):
+    path = tmp_path / 'a.utf8'
+    path.write_text('data')
+    detector = ReadinessDetector(quiet_period=0.2, timeout=5)
+    detector.observe(str(path))
+    time.sleep(0.25)
+    path.write_text('more data')
+    assert detector.check(str(path))[0] == WAITING
+
+def test_closed_file_is_ready_without_waiting(tmp_path):
+    path = tmp_path / 'a.utf8'
+    path.write_text('data')
+    detector = ReadinessDetector(quiet_period=10, timeout=60)
+    detector.observe(str(path), closed=True)
+    assert detector.check(str(path))[0] == READY
+
+def test_check_missing_file(tmp_path):
+    assert ReadinessDetector().check(str(tmp_path / 'none.utf8')) == (GONE, 0)
@@ -0,0 +1,129 @@
+import os
+import time
+from reconciler import Reconciler
+
+class FakeHandler:
+    def __init__(self, source_path, recursive=False, extension='.utf8', name=None):
+        self.source_path = source_path
+        self.recursive = recursive
+        self.extension = extension
+        self.name = name or source_path
+        self.scheduled = []
+        self.busy = set()
+
+    def accepts(self, file_path):
+        return file_path.endswith(self.extension)
+
+    def schedule_event(self, file_path, is_directory):
+        self.scheduled.append(file_path)
+
+    def in_flight(self, file_path):
+        return file_path in self.busy
+
+def age(path, seconds):
+    """把文件（夹）的修改时间改到seconds秒之前，避免被当作刚修改而不记录"""
+    past = time.time() - seconds
+    os.utime(str(path), (past, past))
+
+def test_new_file_found(tmp_path):
+    handler = FakeHandler(str(tmp_path))
+    reconciler = Reconciler(interval=0)
+    assert reconciler.scan(handler, enqueue=False) == 0
+
+    (tmp_path / 'a.utf8').write_text('a')
+    (tmp_path / 'b.txt').write_text('b')
+    assert reconciler.scan(handler) == 1
+    assert handler.scheduled == [str(tmp_path / 'a.utf8')]
+
+def test_rewritten_file_with_same_name_found(tmp_path):
+    handler = FakeHandler(str(tmp_path))
+    reconciler = Reconciler(interval=0)
+    source = tmp_path / 'a.utf8'
+    source.write_text('first')
+    age(source, 100)
+    age(tmp_path, 100)
+    reconciler.scan(handler, enqueue=False)
+
+    # 处理后删除，又以同一文件名重新导出，事件被漏掉
+    source.unlink()
+    source.write_text('second export')
+    age(source, 50)
+    age(tmp_path, 50)
+    assert reconciler.scan(handler) == 1
+
+def test_unchanged_folder_skipped(tmp_path):
+    handler = FakeHandler(str(tmp_path))
+    reconciler = Reconciler(interval=0)
+    (tmp_path / 'a.utf8').write_text('a')
+    age(tmp_path, 100)
+    reconciler.scan(handler, enqueue=False)
+    assert reconciler.scan(handler) == 0
+
+def test_recursive_subfolders(tmp_path):
+    handler = FakeHandler(str(tmp_path), recursive=True)
+    reconciler = Reconciler(interval=0)
+    reconciler.scan(handler, enqueue=False)
+
+    nested = tmp_path / 'day' / 'run'
+    nested.mkdir(parents=True)
+    (nested / 'a.utf8').write_text('a')
+    assert reconciler.scan(handler) == 1
+    assert handler.scheduled == [str(nested / 'a.utf8')]
+
+def test_update_does_not_walk(tmp_path):
+    handler = FakeHandler(str(tmp_path))
+    reconciler = Reconciler(interval=0)
+    reconciler.update([handler])
+    assert reconciler.snapshots == {}
+
+    # 扫描线程第一次只记录基准快照，之后才报告新文件
+    (tmp_path / 'old.utf8').write_text('a')
+    reconciler.scan_all()
+    assert handler.scheduled == []
+    (tmp_path / 'new.utf8').write_text('b')
+    reconciler.scan_all()
+    assert handler.scheduled == [str(tmp_path / 'new.utf8')]
+
+def test_watches_sharing_a_folder_keep_separate_snapshots(tmp_path):
+    utf8 = FakeHandler(str(tmp_path), name='Paths')
+    csv = FakeHandler(str(tmp_path), extension='.csv', name='csv')
+    reconciler = Reconciler(interval=0)
+    reconciler.update([utf8, csv])
+    age(tmp_path, 100)
+    reconciler.scan_all()
+
+    (tmp_path / 'x.utf8').write_text('a')
+    (tmp_path / 'y.csv').write_text('b')
+    age(tmp_path, 50)
+    reconciler.scan_all()
+    assert utf8.scheduled == [str(tmp_path / 'x.utf8')]
+    assert csv.scheduled == [str(tmp_path / 'y.csv')]
+
+def test_nested_watch_inside_recursive_watch(tmp_path):
+    inner = tmp_path / 'lab'
+    inner.mkdir()
+    outer = FakeHandler(str(tmp_path), recursive=True, name='outer')
+    nested = FakeHandler(str(inner), extension='.csv', name='nested')
+    reconciler = Reconciler(interval=0)
+    reconciler.update([outer, nested])
+    age(inner, 100)
+    reconciler.scan_all()
+
+    (inner / 'a.utf8').write_text('a')
+    (inner / 'b.csv').write_text('b')
+    age(inner, 50)
+    reconciler.scan_all()
+    assert outer.scheduled == [str(inner / 'a.utf8')]
+    assert nested.scheduled == [str(inner / 'b.csv')]
+
+def test_in_flight_files_not_rescheduled(tmp_path):
+    handler = FakeHandler(str(tmp_path))
+    reconciler = Reconciler(interval=0)
+    reconciler.scan(handler, enqueue=False)
+
+    (tmp_path / 'a.utf8').write_text('a')
+    (tmp_path / 'b.utf8').write_text('b')
+    # 观察者已安排a.utf8，仍在等待写入完成
+    handler.busy.add(str(tmp_path / 'a.utf8'))
+    assert reconciler.scan(handler) == 1
+    assert handler.scheduled == [str(tmp_path / 'b.utf8')]
@@ -0,0 +1,58 @@
+import os
+from types import SimpleNamespace
+from engine import WatchRouter
+
+class FakeHandler:
+    def __init__(self, source_path, extensions, recursive=False):
+        self.source_path = source_path
+        self.extensions = extensions
+        self.recursive = recursive
+        self.events = []
+
+    def accepts(self, file_path):
+        return file_path.lower().endswith(self.extensions)
+
+    def dispatch(self, event):
+        self.events.append(event)
+
+def created(path, is_directory=False):
+    return SimpleNamespace(event_type='created', src_path=path, is_directory=is_directory)
+
+def test_same_source_split_by_extension(tmp_path):
+    utf8 = FakeHandler(str(tmp_path), ('.utf8',))
+    csv = FakeHandler(str(tmp_path), ('.csv',))
+    router = WatchRouter()
+    router.update([utf8, csv])
+
+    assert router.find(str(tmp_path / 'x.utf8')) is utf8
+    assert router.find(str(tmp_path / 'y.csv')) is csv
+    assert router.find(str(tmp_path / 'z.txt')) is None
+
+    router.dispatch(created(str(tmp_path / 'x.utf8')))
+    router.dispatch(created(str(tmp_path / 'y.csv')))
+    assert len(utf8.events) == 1 and len(csv.events) == 1
+
+def test_recursive_parent_receives_nested_files(tmp_path):
+    nested = tmp_path / 'lab' / 'run1'
+    parent = FakeHandler(str(tmp_path), ('.utf8',), recursive=True)
+    child = FakeHandler(str(tmp_path / 'lab'), ('.csv',))
+    router = WatchRouter()
+    router.update([parent, child])
+
+    assert router.find(str(nested / 'a.utf8')) is parent
+    # 子文件夹的监控不接受的文件交给上层的递归监控
+    assert router.find(str(tmp_path / 'lab' / 'b.utf8')) is parent
+    assert router.find(str(tmp_path / 'lab' / 'b.csv')) is child
+
+def test_non_recursive_ignores_subfolders(tmp_path):
+    handler = FakeHandler(str(tmp_path), ('.utf8',))
+    router = WatchRouter()
+    router.update([handler])
+    assert router.find(os.path.join(str(tmp_path), 'sub', 'a.utf8')) is None
+
+def test_directory_events_are_not_dispatched(tmp_path):
+    handler = FakeHandler(str(tmp_path), ('.utf8',), recursive=True)
+    router = WatchRouter()
+    router.update([handler])
+    router.dispatch(created(str(tmp_path / 'run1'), is_directory=True))
+    assert handler.events == []
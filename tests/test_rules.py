@@ -0,0 +1,64 @@
+import io
+from rules import Rule, RulePlan, RuleEngine, DEFAULT_RULES
+
+def legacy_line7(line):
+    """改写前的内置行为：第7行含6且不含6.时把所有6改为6."""
+    if '6' in line and '6.' not in line:
+        return line.replace('6', '6.')
+    return line
+
+def default_plan():
+    return RuleEngine().plan_for('a.utf8')
+
+def test_default_rule_matches_legacy_behaviour():
+    plan = default_plan()
+    for line7 in ['16', 'Result 6', '6 and 66', '6.5', 'none', '', '16.0 6']:
+        head = [b'%d\r\n' % i for i in range(1, 7)] + [line7.encode() + b'\r\n']
+        plan.apply_head(head)
+        assert head[6] == legacy_line7(line7).encode() + b'\r\n'
+        # 其他行不修改
+        assert head[:6] == [b'%d\r\n' % i for i in range(1, 7)]
+
+def test_default_rule_only_for_utf8_files():
+    assert default_plan().head_lines == 7
+    assert RuleEngine().plan_for('a.csv') is None
+
+def test_apply_head_preserves_crlf_and_records_changes():
+    plan = default_plan()
+    head = [b'x\r\n'] * 6 + [b'16\r\n']
+    changes = []
+    assert plan.apply_head(head, changes)
+    assert head[6] == b'16.\r\n'
+    assert changes == [(7, '16', '16.')]
+
+def test_apply_head_keeps_lf_and_missing_newline():
+    plan = default_plan()
+    head = [b'x\n'] * 6 + [b'6']
+    plan.apply_head(head)
+    assert head[6] == b'6.'
+
+def test_apply_rest_every_line_rule_preserves_line_endings():
+    plan = RulePlan([Rule('comma', pattern=';', replace=',')])
+    src = io.BytesIO(b'a;b\r\nc;d\nno change\r\n')
+    dst = io.BytesIO()
+    changes = []
+    assert plan.apply_rest(src, dst, 1, changes)
+    assert dst.getvalue() == b'a,b\r\nc,d\nno change\r\n'
+    assert [number for number, _, _ in changes] == [1, 2]
+
+def test_line_range_rule():
+    plan = RulePlan([Rule('range', line='2-3', pattern='x', replace='y')])
+    head = [b'x\r\n', b'x\r\n', b'x\r\n', b'x\r\n']
+    plan.apply_head(head)
+    assert head == [b'x\r\n', b'y\r\n', b'y\r\n', b'x\r\n']
+    assert plan.head_lines == 3
+
+def test_config_rules_replace_defaults(tmp_path):
+    config = tmp_path / 'tibasepath.conf'
+    config.write_text('[Rule:csv]\nfiles = *.csv\nline = 1\npattern = a\nreplace = b\n', encoding='utf-8')
+    engine = RuleEngine(str(config))
+    assert engine.plan_for('a.utf8') is None
+    head = [b'abc\r\n']
+    engine.plan_for('x.CSV').apply_head(head)
+    assert head == [b'bbc\r\n']
+    assert 'line7' in DEFAULT_RULES
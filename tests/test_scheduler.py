@@ -0,0 +1,65 @@
+import time
+import threading
+from scheduler import CoalescingScheduler
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_events_for_same_path_run_once():
+    scheduler = CoalescingScheduler(settle=0.1)
+    runs = []
+    scheduler.start()
+    try:
+        # created、modified、closed 连续到达
+        for event in ('created', 'modified', 'closed'):
+            scheduler.schedule('a.utf8', lambda event=event: runs.append(('a.utf8', event)))
+        scheduler.schedule('b.utf8', lambda: runs.append(('b.utf8', 'created')))
+        assert wait_for(lambda: len(runs) == 2)
+        time.sleep(0.2)
+    finally:
+        scheduler.stop()
+    assert sorted(runs) == [('a.utf8', 'closed'), ('b.utf8', 'created')]
+    assert scheduler.coalesced == 2
+
+def test_reschedule_postpones_action():
+    scheduler = CoalescingScheduler(settle=0.2)
+    ran = threading.Event()
+    scheduler.start()
+    try:
+        started = time.monotonic()
+        scheduler.schedule('a', ran.set)
+        time.sleep(0.1)
+        scheduler.schedule('a', ran.set)
+        assert ran.wait(2)
+        # 从最后一次事件起算静默时间
+        assert time.monotonic() - started >= 0.3
+    finally:
+        scheduler.stop()
+
+def test_cancel_and_keys():
+    scheduler = CoalescingScheduler(settle=0.05)
+    runs = []
+    scheduler.start()
+    try:
+        scheduler.schedule('a', lambda: runs.append('a'), delay=10)
+        scheduler.schedule('b', lambda: runs.append('b'))
+        assert sorted(scheduler.keys()) == ['a', 'b']
+        scheduler.cancel('a')
+        assert wait_for(lambda: runs == ['b'])
+        assert len(scheduler) == 0
+    finally:
+        scheduler.stop()
+
+def test_earlier_delay_wakes_scheduler():
+    scheduler = CoalescingScheduler(settle=10)
+    ran = threading.Event()
+    scheduler.start()
+    try:
+        scheduler.schedule('slow', lambda: None)
+        scheduler.schedule('fast', ran.set, delay=0)
+        assert ran.wait(2)
+    finally:
+        scheduler.stop()
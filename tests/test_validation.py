@@ -0,0 +1,81 @@
+import os
+from validation import ExportFormat, Validator, parse_chunk, split_chunks, merge_chunks
+
+HEAD = 'Instrument=Titrando\r\nWeight: 1.25\r\n\r\nSample ID,Time,Result\r\n'
+
+def export(tmp_path, rows, head=HEAD, name='a.utf8'):
+    path = tmp_path / name
+    path.write_bytes((head + ''.join(rows)).encode('utf-8'))
+    return str(path)
+
+def fmt():
+    return ExportFormat(columns=True, required=['Instrument'], sample_field='Sample ID',
+                        numeric=['Result', 'Weight'], min_rows=1)
+
+def parse(path, chunk_size):
+    chunks = split_chunks(path, os.path.getsize(path), chunk_size)
+    return chunks, merge_chunks([parse_chunk(path, start, end, fmt()) for start, end in chunks], fmt())
+
+def test_split_chunks_on_line_boundaries(tmp_path):
+    path = export(tmp_path, [f'S{i},12:00,{i}\r\n' for i in range(500)])
+    with open(path, 'rb') as f:
+        data = f.read()
+    chunks = split_chunks(path, len(data), 1000)
+    assert len(chunks) > 1
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+        assert data[start - 1:start] == b'\n'
+
+def test_single_chunk_for_small_file(tmp_path):
+    path = export(tmp_path, ['S1,12:00,1\r\n'])
+    assert split_chunks(path, 100, 1000) == [(0, 100)]
+
+def test_error_line_numbers_same_for_any_chunk_size(tmp_path):
+    rows = [f'S{i % 7},12:{i % 60:02d},{i}\r\n' for i in range(2000)]
+    rows[1500] = 'S1,12:00,abc\r\n'
+    rows[20] = 'S1,12:00\r\n'
+    path = export(tmp_path, rows)
+    # 表头4行，第i个数据行是第i+5行
+    expected = [(25, '缺少Result'), (1505, 'Result不是数字: abc')]
+    for chunk_size in (1 << 20, 4096, 100):
+        chunks, summary = parse(path, chunk_size)
+        assert summary.errors == expected, chunk_size
+        assert summary.rows == 2000
+        assert summary.invalid == 2
+        assert summary.samples == [f'S{i}' for i in range(7)]
+    assert len(chunks) > 10
+
+def test_header_checks(tmp_path):
+    path = export(tmp_path, ['S1,12:00,1\r\n'], head='Instrument=\r\nWeight: heavy\r\nSample ID,Time,Result\r\n')
+    _, summary = parse(path, 1 << 20)
+    assert not summary.valid
+    assert [message for _, message in summary.errors] == [
+        '缺少表头字段 Instrument', '表头字段 Weight 不是数字: heavy'
+    ]
+
+def test_min_rows_and_valid_file(tmp_path):
+    _, empty = parse(export(tmp_path, [], name='empty.utf8'), 1 << 20)
+    assert empty.errors == [(0, '数据行数 0 少于 1')]
+    _, good = parse(export(tmp_path, ['S1,12:00,1.5\r\n'], name='good.utf8'), 1 << 20)
+    assert good.valid and good.rows == 1 and good.values == 1
+    assert good.header == {'Instrument': 'Titrando', 'Weight': '1.25'}
+
+def test_invalid_utf8_header(tmp_path):
+    path = tmp_path / 'bin.utf8'
+    path.write_bytes(b'\xff\xfe\x00garbage\n')
+    _, summary = parse(str(path), 1 << 20)
+    assert summary.errors[0] == (0, '表头不是有效的UTF-8')
+
+def test_validator_caches_by_content(tmp_path):
+    validator = Validator(fmt(), processes=1)
+    validator.start()
+    try:
+        first = validator.validate(export(tmp_path, ['S1,12:00,1\r\n'], name='a.utf8'))
+        # 另一个文件名、相同内容，不再解析
+        second = validator.validate(export(tmp_path, ['S1,12:00,1\r\n'], name='b.utf8'))
+    finally:
+        validator.stop()
+    assert first.valid and second is first
+    assert validator.cache.hits == 1
+    assert validator.accepts('x.UTF8') and not validator.accepts('x.csv')
@@ -0,0 +1,67 @@
+import time
+import threading
+from worker_pool import WorkerPool, LIVE, BACKLOG
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_pending_path_refused():
+    handled = []
+    pool = WorkerPool(handled.append, workers=1)
+    pool.pause()
+    pool.start()
+    try:
+        assert pool.submit('a.utf8')
+        # 排队中的路径不重复提交
+        assert not pool.submit('a.utf8')
+        assert pool.is_pending('a.utf8')
+        pool.resume()
+        assert wait_for(pool.is_idle)
+        # 处理完后可以再次提交
+        assert pool.submit('a.utf8')
+        assert wait_for(lambda: len(handled) == 2)
+    finally:
+        pool.stop()
+    assert pool.dropped == 0
+
+def test_full_queue_counts_dropped():
+    pool = WorkerPool(lambda path: None, workers=1, queue_size=2)
+    pool.pause()
+    pool.start()
+    try:
+        assert pool.submit('a.utf8')
+        assert pool.submit('b.utf8')
+        assert not pool.submit('c.utf8')
+        assert pool.dropped == 1
+        assert not pool.is_pending('c.utf8')
+    finally:
+        pool.resume()
+        pool.stop()
+
+def test_live_before_backlog():
+    handled = []
+    release = threading.Event()
+
+    def handler(path):
+        if path == 'busy':
+            release.wait(5)
+        handled.append(path)
+
+    pool = WorkerPool(handler, workers=1)
+    pool.start()
+    try:
+        # 工作线程忙于处理时，积压文件先于实时事件排队
+        assert pool.submit('busy')
+        assert wait_for(lambda: pool.qsize() == 0)
+        for name in ('old1', 'old2'):
+            assert pool.submit(name, priority=BACKLOG)
+        for name in ('new1', 'new2'):
+            assert pool.submit(name, priority=LIVE)
+        release.set()
+        assert wait_for(lambda: len(handled) == 5)
+    finally:
+        pool.stop()
+    assert handled == ['busy', 'new1', 'new2', 'old1', 'old2']
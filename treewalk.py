@@ -0,0 +1,52 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+def list_directory(directory, accept=None):
+    """列出一个文件夹，返回 ([(文件路径, stat)], [子文件夹路径])
+
+    accept为空或accept(路径)为真的文件才调用stat；不进入符号链接的文件夹。
+    """
+    files, subdirs = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif (accept is None or accept(entry.path)) and entry.is_file():
+                    files.append((entry.path, entry.stat()))
+            except OSError:
+                continue
+    return files, subdirs
+
+def walk_parallel(root, visit, recursive=True, workers=8):
+    """从root开始遍历文件夹树，按完成顺序生成 (文件夹, visit的结果)
+
+    visit(文件夹) 返回 (结果, 子文件夹列表)。递归时各文件夹的visit在
+    线程池中并行执行（scandir和stat等待磁盘或网络时不占用GIL），子文件夹
+    一列出就提交，深层的大文件夹树也能很快遍历完。不递归时只在当前线程
+    访问root。无法读取的文件夹会被跳过。
+    """
+    if not recursive:
+        try:
+            result, _ = visit(root)
+        except OSError as e:
+            logging.debug("无法读取文件夹: %s: %s", root, e)
+            return
+        yield root, result
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='Scan') as executor:
+        pending = {executor.submit(visit, root): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory = pending.pop(future)
+                try:
+                    result, subdirs = future.result()
+                except OSError as e:
+                    logging.debug("无法读取文件夹: %s: %s", directory, e)
+                    continue
+                for subdir in subdirs:
+                    pending[executor.submit(visit, subdir)] = subdir
+                yield directory, result
@@ -0,0 +1,332 @@
+import os
+import re
+import fnmatch
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bounded_record import BoundedRecord
+
+MAX_SAMPLES = 50  # 摘要中最多保留的样品编号数
+MAX_ERRORS = 20  # 摘要中最多保留的错误数
+HASH_BUFFER_SIZE = 1024 * 1024
+
+def parse_names(value):
+    """解析字段列表：用分号或换行分隔（字段名中可以有空格）"""
+    return tuple(name.strip() for name in re.split(r'[;\n]', value) if name.strip())
+
+class ExportFormat:
+    """导出文件的格式和校验要求，随解析任务传给解析进程
+
+    文件开头连续的 键=值、键: 值 或 键<Tab>值 行是表头，其后是按delimiter
+    分隔的数据行；columns为真时数据的第一行是列名。required中的表头字段
+    必须存在且非空；sample_field是样品编号所在的表头字段或列名；numeric
+    中的表头字段或列（列名或从1开始的列号）必须是数字。
+    """
+
+    def __init__(self, delimiter=',', columns=False, required=(), sample_field='',
+                 numeric=(), min_rows=0):
+        self.delimiter = delimiter.replace('\\t', '\t') or ','
+        self.columns = columns
+        self.required = tuple(required)
+        self.sample_field = sample_field
+        self.numeric = tuple(numeric)
+        self.min_rows = min_rows
+        # 键中不能有数据分隔符，含时间（12:30）的数据行不会被当作表头
+        separators = '=:\t'.replace(self.delimiter, '')
+        self.header_line = re.compile(
+            r'^\s*([^%s%s]+?)\s*[%s]\s*(.*?)\s*$' % (
+                re.escape(separators), re.escape(self.delimiter), re.escape(separators))
+        )
+
+def decode_line(raw, first=False):
+    """解码一行（bytes），去掉换行符；第一行去掉BOM"""
+    text = raw.decode('utf-8').rstrip('\r\n')
+    if first and text.startswith('\ufeff'):
+        text = text[1:]
+    return text
+
+def read_layout(f, fmt):
+    """从文件开头读取表头和列名
+
+    返回 (表头字段, 列名, 数据开始的偏移, 表头部分的错误)，列名行算在表头部分。
+    """
+    header, columns, errors = {}, None, []
+    f.seek(0)
+    offset = 0
+    first = True
+    for raw in f:
+        try:
+            text = decode_line(raw, first)
+        except UnicodeDecodeError:
+            errors.append("表头不是有效的UTF-8")
+            break
+        first = False
+        if not text.strip():
+            offset += len(raw)
+            continue
+        match = fmt.header_line.match(text)
+        if match:
+            header.setdefault(match.group(1), match.group(2))
+            offset += len(raw)
+            continue
+        if fmt.columns:
+            columns = [name.strip() for name in text.split(fmt.delimiter)]
+            offset += len(raw)
+        break
+    return header, columns, offset, errors
+
+def resolve_fields(fmt, header, columns):
+    """把校验要求对应到表头字段和列号
+
+    返回 (数字表头字段, 数字列号, 样品编号列号, 缺少的字段)。
+    """
+    numeric_keys, numeric_indexes, missing = [], [], []
+    positions = {name: i for i, name in enumerate(columns or ())}
+    for field in fmt.numeric:
+        if field in header:
+            numeric_keys.append(field)
+        elif field in positions:
+            numeric_indexes.append((positions[field], field))
+        elif field.isdigit() and int(field) >= 1:
+            numeric_indexes.append((int(field) - 1, f"第{field}列"))
+        else:
+            missing.append(field)
+    sample_index = None
+    if fmt.sample_field and fmt.sample_field not in header:
+        if fmt.sample_field in positions:
+            sample_index = positions[fmt.sample_field]
+        else:
+            missing.append(fmt.sample_field)
+    return numeric_keys, numeric_indexes, sample_index, missing
+
+def is_number(text):
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+def parse_chunk(path, start, end, fmt):
+    """解析文件中 [start, end) 的字节范围（都在行首），在解析进程中执行
+
+    每个块都自己读取表头来确定列的位置；只有第一个块检查表头。返回的
+    摘要只包含计数、少量样品编号和错误，行号相对于块的开头。
+    """
+    result = {'lines': 0, 'rows': 0, 'values': 0, 'invalid': 0,
+              'samples': [], 'errors': [], 'header': None}
+
+    def error(number, message):
+        result['invalid'] += 1
+        if len(result['errors']) < MAX_ERRORS:
+            result['errors'].append((number, message))
+
+    with open(path, 'rb') as f:
+        header, columns, data_start, head_errors = read_layout(f, fmt)
+        numeric_keys, numeric_indexes, sample_index, missing = resolve_fields(fmt, header, columns)
+        if head_errors:
+            # 无法读取表头时只报告这一个错误
+            if start == 0:
+                for message in head_errors:
+                    error(0, message)
+            return result
+        if start == 0:
+            result['header'] = header
+            for field in missing:
+                error(0, f"缺少字段 {field}")
+            for field in fmt.required:
+                if not header.get(field):
+                    error(0, f"缺少表头字段 {field}")
+            for field in numeric_keys:
+                if not is_number(header[field]):
+                    error(0, f"表头字段 {field} 不是数字: {header[field]}")
+            if fmt.sample_field in header:
+                result['samples'].append(header[fmt.sample_field])
+
+        samples = set(result['samples'])
+        f.seek(start)
+        offset = start
+        for number, raw in enumerate(f, 1):
+            if offset >= end:
+                break
+            result['lines'] = number
+            position = offset
+            offset += len(raw)
+            if position < data_start:
+                continue
+            try:
+                text = decode_line(raw)
+            except UnicodeDecodeError:
+                error(number, "不是有效的UTF-8")
+                continue
+            if not text.strip():
+                continue
+            cells = text.split(fmt.delimiter)
+            result['rows'] += 1
+            for index, field in numeric_indexes:
+                if index >= len(cells):
+                    error(number, f"缺少{field}")
+                elif is_number(cells[index].strip()):
+                    result['values'] += 1
+                else:
+                    error(number, f"{field}不是数字: {cells[index].strip()}")
+            if sample_index is not None and sample_index < len(cells):
+                sample = cells[sample_index].strip()
+                if sample and sample not in samples and len(samples) < MAX_SAMPLES:
+                    samples.add(sample)
+                    result['samples'].append(sample)
+    return result
+
+def split_chunks(path, size, chunk_size):
+    """按chunk_size把文件切成若干块，块的边界对齐到行首"""
+    if size <= chunk_size:
+        return [(0, size)]
+    bounds = [0]
+    with open(path, 'rb') as f:
+        position = chunk_size
+        while position < size:
+            f.seek(position)
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            bounds.append(position)
+            position += chunk_size
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def hash_file(path):
+    """计算文件内容的SHA-256（hashlib在大块数据上释放GIL）"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(HASH_BUFFER_SIZE)
+            if not data:
+                break
+            hasher.update(data)
+    return hasher.digest()
+
+class Summary:
+    """一个文件的解析结果：表头、样品编号、数据行数、数字字段数和错误"""
+
+    __slots__ = ('header', 'samples', 'rows', 'values', 'invalid', 'errors')
+
+    def __init__(self, header, samples, rows, values, invalid, errors):
+        self.header = header
+        self.samples = samples
+        self.rows = rows
+        self.values = values
+        self.invalid = invalid
+        self.errors = errors  # [(行号, 说明)]，行号0表示表头
+
+    @property
+    def valid(self):
+        return not self.invalid
+
+    def describe_errors(self, limit=3):
+        """把错误概括为日志中的一段文字"""
+        text = "; ".join(
+            f"第{number}行 {message}" if number else message
+            for number, message in self.errors[:limit]
+        )
+        if self.invalid > limit:
+            text += f" 等共{self.invalid}处"
+        return text
+
+def merge_chunks(parts, fmt):
+    """合并各块的解析结果，行号换算为文件中的行号"""
+    samples, errors = [], []
+    rows = values = invalid = lines = 0
+    for part in parts:
+        for sample in part['samples']:
+            if sample not in samples and len(samples) < MAX_SAMPLES:
+                samples.append(sample)
+        for number, message in part['errors']:
+            if len(errors) < MAX_ERRORS:
+                errors.append((number + lines if number else 0, message))
+        rows += part['rows']
+        values += part['values']
+        invalid += part['invalid']
+        lines += part['lines']
+    if rows < fmt.min_rows:
+        invalid += 1
+        errors.append((0, f"数据行数 {rows} 少于 {fmt.min_rows}"))
+    return Summary(parts[0]['header'] or {}, samples, rows, values, invalid, errors)
+
+class Validator:
+    """在写入目标之前解析和校验导出文件（可选的处理阶段）
+
+    解析是CPU密集的工作，放在独立的解析进程中进行，不占用监控和处理
+    线程的GIL。解析进程自己读取文件，大文件按行边界切成chunk_size的块
+    分别提交，多个进程同时解析，只把摘要传回。解析结果按内容的SHA-256
+    缓存，重复导出的相同文件不再解析。
+    """
+
+    def __init__(self, fmt, files='*.utf8', processes=2, chunk_size=4 * 1024 * 1024,
+                 cache_size=10000, quarantine=''):
+        self.fmt = fmt
+        self.globs = [re.compile(fnmatch.translate(g))
+                      for g in re.split(r'[;\s]+', files.lower()) if g]
+        self.processes = max(1, processes)
+        self.chunk_size = max(64 * 1024, chunk_size)
+        self.cache = BoundedRecord(cache_size, ttl=0)  # 内容摘要 -> Summary
+        self.quarantine_path = quarantine
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.processes)
+
+    def stop(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def accepts(self, file_path):
+        """是否需要解析校验该文件"""
+        name = os.path.basename(file_path).lower()
+        return any(regex.match(name) for regex in self.globs)
+
+    def _submit(self, chunks, file_path):
+        with self.lock:
+            if self.executor is None:
+                raise RuntimeError("解析进程未启动")
+            return [self.executor.submit(parse_chunk, file_path, start, end, self.fmt)
+                    for start, end in chunks]
+
+    def _restart(self, executor):
+        """解析进程异常退出后重新创建进程池，当前文件稍后重试"""
+        with self.lock:
+            if self.executor is executor:
+                logging.error("解析进程异常退出，重新启动解析进程")
+                self.executor = ProcessPoolExecutor(max_workers=self.processes)
+        executor.shutdown(wait=False)
+
+    def validate(self, file_path):
+        """解析并校验文件，返回Summary；读取失败时抛出OSError"""
+        st = os.stat(file_path)
+        digest = hash_file(file_path)
+        summary = self.cache.get(digest)
+        if summary is not None:
+            return summary
+
+        executor = self.executor
+        chunks = split_chunks(file_path, st.st_size, self.chunk_size)
+        try:
+            parts = [future.result() for future in self._submit(chunks, file_path)]
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+        summary = merge_chunks(parts, self.fmt)
+        # 解析期间文件被改写时结果不一定对应摘要，不缓存
+        now = os.stat(file_path)
+        if (now.st_size, now.st_mtime_ns) == (st.st_size, st.st_mtime_ns):
+            self.cache[digest] = summary
+        return summary
+
+    def get_stats(self):
+        return f"解析缓存: {self.cache.get_stats()}"
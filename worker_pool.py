@@ -0,0 +1,111 @@
+import queue
+import logging
+import threading
+
+# 任务优先级：实时事件优先于启动时积压的文件
+LIVE = 0
+BACKLOG = 1
+
+class WorkerPool:
+    """有界优先级队列 + 固定数量工作线程的处理池
+
+    事件回调只负责把文件路径放入队列，由工作线程并发调用 handler。
+    同一路径在排队或处理中时不会被重复提交。实时事件总是排在
+    积压文件之前。
+    """
+
+    def __init__(self, handler=None, workers=4, queue_size=1000, name='Worker'):
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.name = name
+        self.queue = queue.PriorityQueue(maxsize=self.queue_size)
+        self.sequence = 0  # 同优先级内按提交顺序处理
+        self.pending = set()  # 排队中或处理中的路径
+        self.lock = threading.Lock()
+        self.threads = []
+        self.running = False
+        self.unpaused = threading.Event()  # 暂停时工作线程不再取出新任务
+        self.unpaused.set()
+        self.dropped = 0  # 队列已满被丢弃的任务数
+
+    def start(self):
+        """启动工作线程"""
+        if self.running:
+            return
+        self.running = True
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"{self.name}-{i + 1}",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        """停止工作线程，正在处理的任务会执行完毕"""
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def submit(self, path, handler=None, priority=LIVE):
+        """提交路径，已在队列/处理中或队列已满时返回False
+
+        handler为空时使用创建处理池时指定的处理函数，多个监控共享
+        同一个处理池时各自传入自己的处理函数。
+        """
+        with self.lock:
+            if path in self.pending:
+                return False
+            try:
+                self.sequence += 1
+                self.queue.put_nowait((priority, self.sequence, path, handler or self.handler))
+            except queue.Full:
+                self.dropped += 1
+                logging.warning("处理队列已满，忽略文件: %s", path)
+                return False
+            self.pending.add(path)
+        return True
+
+    def pause(self):
+        """暂停处理，正在处理的任务会执行完毕，新任务继续排队"""
+        self.unpaused.clear()
+
+    def resume(self):
+        self.unpaused.set()
+
+    def is_paused(self):
+        return not self.unpaused.is_set()
+
+    def is_idle(self):
+        """没有排队或处理中的任务"""
+        with self.lock:
+            return not self.pending
+
+    def is_pending(self, path):
+        """路径是否在排队或处理中"""
+        with self.lock:
+            return path in self.pending
+
+    def qsize(self):
+        """当前排队的任务数"""
+        return self.queue.qsize()
+
+    def _worker_loop(self):
+        while self.running:
+            if not self.unpaused.wait(0.5):
+                continue
+            try:
+                _, _, path, handler = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                handler(path)
+            except Exception as e:
+                logging.error(f"工作线程处理文件时出错: {str(e)}", exc_info=True)
+            finally:
+                with self.lock:
+                    self.pending.discard(path)
+                self.queue.task_done()